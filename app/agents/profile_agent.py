@@ -1,20 +1,26 @@
 from __future__ import annotations
-from typing import Any, Dict, Tuple
+from typing import Any, Dict, Optional, Tuple
 from typing_extensions import TypedDict
 import asyncio
+import logging
 import time
 from pydantic import ValidationError
 
 from langgraph.graph import StateGraph, END
 
-from app.utils.intent import classify_intent
+from app.utils.intent import classify_intent_async
 from app.utils.json_utils import unwrap_tool_result
 from app.utils.builders import build_email_address_output, build_preferences_output
+from app.utils.render_cache import render_cache, canonical_json, content_hash
+from app.agents.session_store import get_checkpointer, is_fresh
+from app.telemetry.profiling import profiled_node
 from app.tools.profile_tools import (
     fetch_email_and_address_async,
     fetch_contact_preference_async,
 )
 
+logger = logging.getLogger(__name__)
+
 # -------- LangGraph state --------
 class AgentState(TypedDict, total=False):
     query: str
@@ -22,22 +28,39 @@ class AgentState(TypedDict, total=False):
     intent: str
     raw: Dict[str, Any]
     out: Dict[str, Any]
+    # Conversation-scoped: which member `raw` belongs to and when each intent was fetched.
+    raw_member_id: str
+    fetched_at: Dict[str, float]
+    # Content hash of the serialized `out` (used as the HTTP ETag).
+    etag: str
+
+DEFAULT_MEMBER_ID = "378477398"
 
 async def node_classify(state: AgentState) -> AgentState:
-    intent = classify_intent(state.get("query", ""))
-    return {**state, "intent": intent}
+    intent = await classify_intent_async(state.get("query", ""))
+    # Follow-up turns may omit the member; keep the conversation's one.
+    member_id = state.get("member_id") or DEFAULT_MEMBER_ID
+    return {**state, "intent": intent, "member_id": member_id}
 
 async def node_fetch(state: AgentState) -> AgentState:
     t0 = time.perf_counter()
     intent = state.get("intent")
     member_id = state.get("member_id", "")
+    prev_raw = state.get("raw") or {}
+    fetched_at = dict(state.get("fetched_at") or {})
+    if state.get("raw_member_id") != member_id:
+        prev_raw, fetched_at = {}, {}
+    if is_fresh(fetched_at.get(intent)):
+        logger.debug("node_fetch[%s]: reused session data", intent)
+        return {**state, "raw": prev_raw}
     if intent == "fetch_email_and_address":
         raw = await fetch_email_and_address_async(member_id=member_id)
     else:
         raw = await fetch_contact_preference_async(member_id=member_id)
-    raw = unwrap_tool_result(raw)
-    print(f"[timing] node_fetch[{intent}]: {(time.perf_counter() - t0)*1000:.1f} ms")
-    return {**state, "raw": raw}
+    raw = {**prev_raw, **unwrap_tool_result(raw)}
+    fetched_at[intent] = time.time()
+    logger.debug("node_fetch[%s]: %.1f ms", intent, (time.perf_counter() - t0)*1000)
+    return {**state, "raw": raw, "raw_member_id": member_id, "fetched_at": fetched_at}
 
 async def node_build(state: AgentState) -> AgentState:
     t0 = time.perf_counter()
@@ -45,34 +68,90 @@ async def node_build(state: AgentState) -> AgentState:
     intent = state.get("intent")
     raw = state.get("raw") or {}
     if intent == "fetch_email_and_address":
-        out = build_email_address_output(member_id, raw.get("email_json"), raw.get("address_json")).model_dump()
+        inputs = (raw.get("email_json"), raw.get("address_json"))
+    else:
+        inputs = (raw.get("preferences_json"),)
+    # Skip the pydantic build entirely when this member's inputs are unchanged.
+    key = f"{intent}:{member_id}"
+    fingerprint = content_hash(canonical_json(inputs))
+    rendered = render_cache.lookup(key, fingerprint)
+    if rendered is not None:
+        logger.debug("node_build[%s]: reused (%.1f ms)", intent, (time.perf_counter() - t0)*1000)
+        return {**state, "out": rendered.out, "etag": rendered.etag}
+    if intent == "fetch_email_and_address":
+        out = build_email_address_output(member_id, *inputs).model_dump()
     else:
-        out = build_preferences_output(member_id, raw.get("preferences_json")).model_dump()
-    print(f"[timing] node_build[{intent}]: {(time.perf_counter() - t0)*1000:.1f} ms")
-    return {**state, "out": out}
+        out = build_preferences_output(member_id, *inputs).model_dump()
+    rendered = render_cache.store(key, fingerprint, out)
+    logger.debug("node_build[%s]: %.1f ms", intent, (time.perf_counter() - t0)*1000)
+    return {**state, "out": out, "etag": rendered.etag}
 
 _graph = StateGraph(AgentState)
-_graph.add_node("classify", node_classify)
-_graph.add_node("fetch", node_fetch)
-_graph.add_node("build", node_build)
+_graph.add_node("classify", profiled_node("classify", node_classify))
+_graph.add_node("fetch", profiled_node("fetch", node_fetch))
+_graph.add_node("build", profiled_node("build", node_build))
 _graph.set_entry_point("classify")
 _graph.add_edge("classify", "fetch")
 _graph.add_edge("fetch", "build")
 _graph.add_edge("build", END)
 app_graph = _graph.compile()
 
-# -------- Public API --------
-async def handle_request_async(*, query: str, member_id: str) -> Tuple[str, Dict[str, Any]]:
+# Conversation-scoped graph, compiled lazily against the configured checkpointer.
+_session_graph: Any = None
+_session_checkpointer: Any = None
+
+async def _get_session_graph() -> Any:
+    global _session_graph, _session_checkpointer
+    checkpointer = await get_checkpointer()
+    if _session_graph is None or checkpointer is not _session_checkpointer:
+        _session_graph = _graph.compile(checkpointer=checkpointer)
+        _session_checkpointer = checkpointer
+    return _session_graph
+
+async def _run_turn_async(
+    query: str, member_id: Optional[str], context_id: Optional[str]
+) -> AgentState:
     t0 = time.perf_counter()
-    state: AgentState = {"query": query, "member_id": member_id}
-    result: AgentState = await app_graph.ainvoke(state)
-    intent = result.get("intent", "")
-    out = result.get("out", {})
-    print(f"[timing] handle_request[{intent} via LangGraph]: total={(time.perf_counter() - t0)*1000:.1f} ms")
-    return intent, out
+    state: AgentState = {"query": query}
+    if member_id:
+        state["member_id"] = member_id
+    if context_id:
+        graph = await _get_session_graph()
+        config = {"configurable": {"thread_id": context_id}}
+        result: AgentState = await graph.ainvoke(state, config)
+    else:
+        result = await app_graph.ainvoke(state)
+    logger.info(
+        "handle_request[%s via LangGraph]: total=%.1f ms",
+        result.get("intent", ""), (time.perf_counter() - t0)*1000,
+    )
+    return result
+
+# -------- Public API --------
+async def handle_request_async(
+    *, query: str, member_id: Optional[str], context_id: Optional[str] = None
+) -> Tuple[str, Dict[str, Any]]:
+    """
+    Run one turn. With `context_id`, state (including fetched `raw` data) is
+    kept per conversation so follow-up turns can skip upstream calls; a
+    missing `member_id` then means "same member as earlier in the conversation".
+    """
+    result = await _run_turn_async(query, member_id, context_id)
+    return result.get("intent", ""), result.get("out", {})
+
+async def handle_request_with_etag_async(
+    *, query: str, member_id: Optional[str], context_id: Optional[str] = None
+) -> Tuple[str, Dict[str, Any], str]:
+    """Like handle_request_async, plus the content hash of `out` (see render_cache)."""
+    result = await _run_turn_async(query, member_id, context_id)
+    return result.get("intent", ""), result.get("out", {}), result.get("etag", "")
 
-def handle_request(*, query: str, member_id: str) -> Tuple[str, Dict[str, Any]]:
+def handle_request(
+    *, query: str, member_id: Optional[str], context_id: Optional[str] = None
+) -> Tuple[str, Dict[str, Any]]:
     """
     Sync wrapper so existing scripts (run_demo.py) can call this directly.
     """
-    return asyncio.run(handle_request_async(query=query, member_id=member_id))
+    return asyncio.run(
+        handle_request_async(query=query, member_id=member_id, context_id=context_id)
+    )
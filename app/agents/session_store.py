@@ -0,0 +1,230 @@
+from __future__ import annotations
+import os
+import time
+import asyncio
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Set, Tuple
+
+from langgraph.checkpoint.memory import InMemorySaver
+
+from app.utils.cache_store import create_private_file
+
+# ------------------------------------------------------------------
+# Config
+# ------------------------------------------------------------------
+# SESSION_BACKEND=memory | sqlite   (default: memory)
+#   sqlite needs the `sqlite-sessions` extra; the file holds fetched member
+#   data and is created 0600.
+SESSION_BACKEND = (os.getenv("SESSION_BACKEND") or "memory").strip().lower()
+SESSION_SQLITE_PATH = os.getenv("SESSION_SQLITE_PATH", "sessions.sqlite")
+# Bounds (both backends): max live conversations, and idle time before eviction.
+SESSION_MAX_THREADS = int(os.getenv("SESSION_MAX_THREADS", "1000"))
+SESSION_IDLE_TTL_S = float(os.getenv("SESSION_IDLE_TTL_S", "1800"))
+# Fetched upstream data older than this is refetched on the next turn.
+SESSION_MAX_AGE_S = float(os.getenv("SESSION_MAX_AGE_S", "300"))
+
+
+class BoundedMemorySaver(InMemorySaver):
+    """
+    InMemorySaver that keeps at most `max_threads` conversations and drops
+    any conversation idle for longer than `idle_ttl_s` (LRU + idle eviction).
+    Within a conversation only the latest checkpoint (per namespace) is kept,
+    with its pending writes and the channel blobs it references, so memory
+    per conversation does not grow with the number of turns. There is no
+    history to time-travel through.
+    """
+
+    def __init__(
+        self,
+        *,
+        max_threads: int = SESSION_MAX_THREADS,
+        idle_ttl_s: float = SESSION_IDLE_TTL_S,
+        clock=time.monotonic,
+        **kwargs: Any,
+    ):
+        super().__init__(**kwargs)
+        self.max_threads = max_threads
+        self.idle_ttl_s = idle_ttl_s
+        self._clock = clock
+        self._last_seen: "OrderedDict[str, float]" = OrderedDict()
+        # (thread_id, checkpoint_ns) -> blob keys stored for it
+        self._blob_keys: Dict[Tuple[str, str], Set[Tuple[str, str, str, Any]]] = {}
+        self.evicted = 0
+        self.pruned = 0
+
+    def _touch(self, thread_id: str) -> None:
+        self._last_seen[thread_id] = self._clock()
+        self._last_seen.move_to_end(thread_id)
+
+    def _evict(self) -> None:
+        now = self._clock()
+        while self._last_seen:
+            thread_id, seen = next(iter(self._last_seen.items()))
+            over_cap = len(self._last_seen) > self.max_threads
+            if not over_cap and now - seen <= self.idle_ttl_s:
+                break
+            self.delete_thread(thread_id)
+            self.evicted += 1
+
+    def get_tuple(self, config):
+        thread_id = config["configurable"]["thread_id"]
+        if thread_id in self._last_seen:
+            if self._clock() - self._last_seen[thread_id] > self.idle_ttl_s:
+                self.delete_thread(thread_id)
+                self.evicted += 1
+            else:
+                self._touch(thread_id)
+        return super().get_tuple(config)
+
+    def put(self, config, checkpoint, metadata, new_versions):
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"]["checkpoint_ns"]
+        self._touch(thread_id)
+        self._evict()
+        saved = super().put(config, checkpoint, metadata, new_versions)
+        self._blob_keys.setdefault((thread_id, checkpoint_ns), set()).update(
+            (thread_id, checkpoint_ns, k, v) for k, v in new_versions.items()
+        )
+        self._prune(thread_id, checkpoint_ns, checkpoint)
+        return saved
+
+    def _prune(self, thread_id: str, checkpoint_ns: str, latest) -> None:
+        """Drop every checkpoint of (thread, ns) but `latest`, with their writes and unreferenced blobs."""
+        checkpoints = self.storage[thread_id][checkpoint_ns]
+        for checkpoint_id in [c for c in checkpoints if c != latest["id"]]:
+            del checkpoints[checkpoint_id]
+            self.writes.pop((thread_id, checkpoint_ns, checkpoint_id), None)
+            self.pruned += 1
+        live = {
+            (thread_id, checkpoint_ns, k, v) for k, v in latest["channel_versions"].items()
+        }
+        keys = self._blob_keys[(thread_id, checkpoint_ns)]
+        for key in keys - live:
+            self.blobs.pop(key, None)
+        keys &= live
+
+    def delete_thread(self, thread_id: str) -> None:
+        self._last_seen.pop(thread_id, None)
+        for key in [k for k in self._blob_keys if k[0] == thread_id]:
+            del self._blob_keys[key]
+        super().delete_thread(thread_id)
+
+    # No __len__: langgraph treats a falsy checkpointer as "no checkpointer".
+    @property
+    def thread_count(self) -> int:
+        return len(self._last_seen)
+
+
+_memory_saver: Optional[BoundedMemorySaver] = None
+_sqlite_saver: Any = None
+_sqlite_loop: Optional[asyncio.AbstractEventLoop] = None
+
+
+def _bounded_sqlite_saver(conn: Any) -> Any:
+    from langgraph.checkpoint.sqlite.aio import AsyncSqliteSaver
+
+    class BoundedSqliteSaver(AsyncSqliteSaver):
+        """
+        AsyncSqliteSaver with the same bounds as BoundedMemorySaver: only the
+        latest checkpoint (and its writes) per thread and namespace is kept,
+        and every `_SWEEP_EVERY` puts conversations idle longer than
+        `idle_ttl_s`, or beyond the `max_threads` most recent, are deleted.
+        Activity is tracked in wall time so all workers sharing the file agree.
+        """
+
+        _SWEEP_EVERY = 64
+
+        def __init__(self, conn: Any, *, max_threads: int = SESSION_MAX_THREADS,
+                     idle_ttl_s: float = SESSION_IDLE_TTL_S) -> None:
+            super().__init__(conn)
+            self.max_threads = max_threads
+            self.idle_ttl_s = idle_ttl_s
+            self._puts = 0
+            self.pruned = 0
+            self.evicted = 0
+
+        async def setup(self) -> None:
+            if self.is_setup:
+                return
+            await super().setup()
+            async with self.lock:
+                await self.conn.execute(
+                    "CREATE TABLE IF NOT EXISTS session_seen (thread_id TEXT PRIMARY KEY, seen REAL NOT NULL)"
+                )
+                await self.conn.commit()
+
+        async def aput(self, config, checkpoint, metadata, new_versions):
+            saved = await super().aput(config, checkpoint, metadata, new_versions)
+            key = (str(config["configurable"]["thread_id"]), config["configurable"]["checkpoint_ns"])
+            async with self.lock:
+                for table in ("checkpoints", "writes"):
+                    cur = await self.conn.execute(
+                        f"DELETE FROM {table} WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id != ?",
+                        (*key, checkpoint["id"]),
+                    )
+                    if table == "checkpoints":
+                        self.pruned += cur.rowcount
+                await self.conn.execute(
+                    "INSERT OR REPLACE INTO session_seen (thread_id, seen) VALUES (?, ?)",
+                    (key[0], time.time()),
+                )
+                await self.conn.commit()
+            self._puts += 1
+            if self._puts % self._SWEEP_EVERY == 0:
+                await self.sweep()
+            return saved
+
+        async def sweep(self) -> None:
+            """Delete idle conversations and those beyond `max_threads`."""
+            async with self.lock:
+                async with self.conn.execute(
+                    "SELECT thread_id FROM session_seen WHERE seen < ?"
+                    " UNION SELECT thread_id FROM"
+                    " (SELECT thread_id FROM session_seen ORDER BY seen DESC LIMIT -1 OFFSET ?)",
+                    (time.time() - self.idle_ttl_s, self.max_threads),
+                ) as cur:
+                    stale = [row[0] for row in await cur.fetchall()]
+                for thread_id in stale:
+                    for table in ("checkpoints", "writes", "session_seen"):
+                        await self.conn.execute(f"DELETE FROM {table} WHERE thread_id = ?", (thread_id,))
+                await self.conn.commit()
+            self.evicted += len(stale)
+
+    return BoundedSqliteSaver(conn)
+
+
+async def _open_sqlite_saver() -> Any:
+    """AsyncSqliteSaver is bound to the loop it was created on; reopen per loop."""
+    global _sqlite_saver, _sqlite_loop
+    loop = asyncio.get_running_loop()
+    if _sqlite_saver is not None and _sqlite_loop is loop:
+        return _sqlite_saver
+    try:
+        import aiosqlite
+        import langgraph.checkpoint.sqlite.aio  # noqa: F401
+    except Exception as e:
+        raise RuntimeError(
+            "SESSION_BACKEND=sqlite requires the 'sqlite-sessions' extra"
+            " (langgraph-checkpoint-sqlite, aiosqlite)"
+        ) from e
+    create_private_file(SESSION_SQLITE_PATH)
+    conn = await aiosqlite.connect(SESSION_SQLITE_PATH)
+    await conn.execute("PRAGMA journal_mode=WAL")
+    _sqlite_saver = _bounded_sqlite_saver(conn)
+    await _sqlite_saver.setup()
+    _sqlite_loop = loop
+    return _sqlite_saver
+
+
+async def get_checkpointer() -> Any:
+    """Return the configured conversation checkpointer (memory or sqlite)."""
+    global _memory_saver
+    if SESSION_BACKEND == "sqlite":
+        return await _open_sqlite_saver()
+    if _memory_saver is None:
+        _memory_saver = BoundedMemorySaver()
+    return _memory_saver
+
+
+def is_fresh(fetched_at: Optional[float]) -> bool:
+    return fetched_at is not None and time.time() - fetched_at <= SESSION_MAX_AGE_S
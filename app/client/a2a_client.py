@@ -13,12 +13,14 @@ async def fetch_agent_card(client: httpx.AsyncClient):
     print(json.dumps(r.json(), indent=2))
 
 
-async def send_message(client: httpx.AsyncClient, text: str):
+async def send_message(client: httpx.AsyncClient, text: str, context_id: str | None = None):
     payload = {
         "kind": "message",
         "role": "user",
         "parts": [{"kind": "text", "text": text}],
     }
+    if context_id:
+        payload["contextId"] = context_id
     r = await client.post(f"{BASE_URL}/a2a/messages", json=payload)
     r.raise_for_status()
     print("RESPONSE:")
@@ -41,6 +43,10 @@ async def main():
             "show my contact preferences for member 378477398",
         )
 
+        # Same conversation: the follow-up reuses already-fetched data
+        await send_message(client, "what's my email for member 378477398", context_id="demo-1")
+        await send_message(client, "and my zip code?", context_id="demo-1")
+
 
 if __name__ == "__main__":
     asyncio.run(main())
@@ -1,14 +1,106 @@
 from __future__ import annotations
 from typing import List, Optional, Dict, Any
+import os
 import re
+import math
+import logging
+import hmac
+import json
+import uuid
+from contextlib import asynccontextmanager
 
-from fastapi import FastAPI
+from fastapi import FastAPI, Header, HTTPException, Request, Response
+from fastapi.responses import JSONResponse
 from pydantic import BaseModel
 
 # ✅ import the ASYNC function
-from app.agents.profile_agent import handle_request_async
+from app.agents.profile_agent import handle_request_with_etag_async, DEFAULT_MEMBER_ID
+from app.utils.render_cache import render_cache, content_hash
+from app.utils.wire_format import (
+    CONTENT_TYPES,
+    WIRE_COMPRESS_MIN_BYTES,
+    negotiate_format,
+    negotiate_encoding,
+    compact_payload,
+    encode_compact,
+    compress,
+    render_envelope,
+)
+from app.telemetry.trace_recorder import get_writer
+from app.telemetry.profiling import (
+    LOOP_MONITOR,
+    loop_monitor,
+    hotspot_stats,
+    start_request_profile,
+    finish_request_profile,
+)
+from app.tools.resilience import CircuitOpenError, upstream_stats
+from app.tools.profile_tools import UpstreamError
+from app.utils.cache_store import get_cache_store
+from app.telemetry.log_pipeline import (
+    configure_logging,
+    shutdown_logging,
+    bind_log_context,
+    reset_log_context,
+    logging_stats,
+)
 
-app = FastAPI(title="Profile Agent A2A", version="0.1.0")
+logger = logging.getLogger(__name__)
+
+# /admin/* is only mounted when ADMIN_TOKEN is set, and then requires
+# `Authorization: Bearer <ADMIN_TOKEN>`.
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN")
+
+@asynccontextmanager
+async def _lifespan(_app: FastAPI):
+    configure_logging()
+    if LOOP_MONITOR:
+        loop_monitor.start()
+    try:
+        yield
+    finally:
+        loop_monitor.stop()
+        shutdown_logging()
+
+app = FastAPI(title="Profile Agent A2A", version="0.1.0", lifespan=_lifespan)
+
+# Upstream trouble is reported as such (no stack trace, not a 500):
+#   breaker open -> 503 + Retry-After, upstream error -> 502, upstream timeout -> 504.
+def _upstream_error(status: int, error: str, exc: Exception, headers: Optional[Dict[str, str]] = None) -> JSONResponse:
+    logger.warning("upstream %s: %s", error, exc)
+    return JSONResponse(
+        status_code=status,
+        content={"kind": "error", "error": error, "message": str(exc) or type(exc).__name__},
+        headers=headers,
+    )
+
+@app.exception_handler(CircuitOpenError)
+async def _circuit_open(_request: Request, exc: CircuitOpenError) -> JSONResponse:
+    retry_after = max(1, math.ceil(exc.retry_after_s))
+    return _upstream_error(503, "circuit_open", exc, {"Retry-After": str(retry_after)})
+
+@app.exception_handler(UpstreamError)
+async def _upstream_failed(_request: Request, exc: UpstreamError) -> JSONResponse:
+    return _upstream_error(502, "upstream_failed", exc)
+
+@app.exception_handler(TimeoutError)
+async def _upstream_timeout(_request: Request, exc: TimeoutError) -> JSONResponse:
+    return _upstream_error(504, "upstream_timeout", exc)
+
+_RECORDED_HEADERS = ("x-conversation-id", "if-none-match")
+
+if get_writer() is not None:
+    # TRACE_MODE=record: capture inbound A2A requests with their arrival times.
+    @app.middleware("http")
+    async def _record_a2a(request: Request, call_next):
+        if request.method == "POST" and request.url.path == "/a2a/messages":
+            try:
+                body = json.loads(await request.body() or b"null")
+            except ValueError:
+                body = None
+            headers = {h: request.headers[h] for h in _RECORDED_HEADERS if h in request.headers}
+            get_writer().a2a(headers, body)
+        return await call_next(request)
 
 class TextPart(BaseModel):
     kind: str = "text"
@@ -18,10 +110,15 @@ class Message(BaseModel):
     kind: str = "message"
     role: str
     parts: List[TextPart]
+    # A2A conversation id; turns sharing it reuse previously fetched data.
+    contextId: Optional[str] = None
 
-def _extract_member_id(text: str) -> str:
+def _find_member_id(text: str) -> Optional[str]:
     m = re.search(r"\b(\d{6,})\b", text or "")
-    return m.group(1) if m else "378477398"
+    return m.group(1) if m else None
+
+def _extract_member_id(text: str) -> str:
+    return _find_member_id(text) or DEFAULT_MEMBER_ID
 
 def _first_text(parts: List[TextPart]) -> str:
     for p in parts or []:
@@ -29,6 +126,19 @@ def _first_text(parts: List[TextPart]) -> str:
             return p.text
     return ""
 
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match or not etag:
+        return False
+    for tag in if_none_match.split(","):
+        tag = tag.strip()
+        if tag == "*":
+            return True
+        if tag.startswith("W/"):
+            tag = tag[2:]
+        if tag.strip('"') == etag:
+            return True
+    return False
+
 @app.get("/healthz")
 async def healthz() -> Dict[str, Any]:
     return {"ok": True}
@@ -45,19 +155,81 @@ async def agent_card() -> Dict[str, Any]:
         "outputs": [{"kind": "message"}],
     }
 
+def _require_admin(authorization: Optional[str]) -> None:
+    scheme, _, token = (authorization or "").partition(" ")
+    if scheme.lower() != "bearer" or not hmac.compare_digest(token.encode(), ADMIN_TOKEN.encode()):
+        raise HTTPException(status_code=401, detail="admin token required",
+                            headers={"WWW-Authenticate": "Bearer"})
+
+if ADMIN_TOKEN:
+    @app.get("/admin/hotspots")
+    async def admin_hotspots(authorization: Optional[str] = Header(None)) -> Dict[str, Any]:
+        """Aggregated per-node timings (profiled requests), loop stalls and cache/upstream counters."""
+        _require_admin(authorization)
+        return {
+            **hotspot_stats(),
+            "upstreams": upstream_stats(),
+            "render_cache": render_cache.stats(),
+            "cache_store": get_cache_store().stats(),
+            "logging": logging_stats(),
+        }
+
 @app.post("/a2a/messages")
-async def a2a_messages(msg: Message) -> Dict[str, Any]:
+async def a2a_messages(
+    msg: Message,
+    x_conversation_id: Optional[str] = Header(default=None),
+    if_none_match: Optional[str] = Header(default=None),
+    x_profile: Optional[str] = Header(default=None),
+    x_request_id: Optional[str] = Header(default=None),
+    accept: Optional[str] = Header(default=None),
+    accept_encoding: Optional[str] = Header(default=None),
+) -> Response:
     text = _first_text(msg.parts)
-    member_id = _extract_member_id(text)
+    context_id = msg.contextId or x_conversation_id
+    # In a conversation, no member id in the text means "same member as before".
+    member_id = _find_member_id(text) if context_id else _extract_member_id(text)
+    request_id = x_request_id or uuid.uuid4().hex
+    log_tokens = bind_log_context(request_id=request_id, member_id=member_id)
 
-    # ✅ await the async handler (DO NOT call the sync wrapper here)
-    tool_name, payload = await handle_request_async(query=text, member_id=member_id)
+    # X-Profile: 1 forces a per-node breakdown in the Server-Timing header.
+    prof_token = start_request_profile(forced=x_profile in {"1", "true", "yes"})
+    try:
+        # ✅ await the async handler (DO NOT call the sync wrapper here)
+        tool_name, payload, etag = await handle_request_with_etag_async(
+            query=text, member_id=member_id, context_id=context_id
+        )
+    finally:
+        profile = finish_request_profile(prof_token)
+        reset_log_context(log_tokens)
 
-    return {
-        "kind": "message",
-        "role": "assistant",
-        "parts": [
-            {"kind": "text", "text": tool_name},
-            {"kind": "json", "json": payload},
-        ],
-    }
+    # Opt-in compact / binary output via Accept; the default JSON is unchanged.
+    fmt = negotiate_format(accept)
+    coding = None
+    if fmt == "json":
+        body = render_cache.body(etag) if etag else None
+        if body is None:
+            body = json.dumps(payload, separators=(",", ":"), ensure_ascii=False, default=str).encode("utf-8")
+    else:
+        def make(out: Dict[str, Any]) -> bytes:
+            return encode_compact(compact_payload(out), fmt)
+        body = render_cache.variant(etag, fmt, make) if render_cache.body(etag) else make(payload)
+    content = render_envelope(tool_name, body, context_id, fmt)
+    if fmt != "json" and len(content) >= WIRE_COMPRESS_MIN_BYTES:
+        coding = negotiate_encoding(accept_encoding)
+
+    # One strong ETag per representation: the envelope carries contextId, and
+    # non-default formats add format + content-coding.
+    ctx_tag = content_hash(context_id.encode("utf-8"))[:12] if context_id else None
+    parts = (etag, ctx_tag) if fmt == "json" else (etag, ctx_tag, fmt, coding)
+    rep_etag = ".".join(filter(None, parts)) if etag else ""
+    headers = {"X-Request-Id": request_id, "Vary": "Accept, Accept-Encoding"}
+    if etag:
+        headers["ETag"] = f'"{rep_etag}"'
+    if profile is not None and profile.forced:
+        headers["Server-Timing"] = profile.server_timing()
+    if _etag_matches(if_none_match, rep_etag):
+        return Response(status_code=304, headers=headers)
+    if coding:
+        content = compress(content, coding)
+        headers["Content-Encoding"] = coding
+    return Response(content=content, media_type=CONTENT_TYPES[fmt], headers=headers)
@@ -0,0 +1,276 @@
+# app/telemetry/log_pipeline.py
+from __future__ import annotations
+import os
+import sys
+import json
+import time
+import queue
+import atexit
+import logging
+import threading
+import contextvars
+from logging.handlers import QueueHandler
+from typing import Any, Dict, List, Optional, Tuple
+
+# ------------------------------------------------------------------
+# Config
+# ------------------------------------------------------------------
+LOG_LEVEL = (os.getenv("LOG_LEVEL") or "INFO").upper()
+# Per-module overrides, e.g. LOG_LEVELS="app.tools=DEBUG,app.agents=WARNING"
+LOG_LEVELS = os.getenv("LOG_LEVELS", "")
+LOG_FORMAT = (os.getenv("LOG_FORMAT") or "json").strip().lower()  # json | text
+LOG_FILE = os.getenv("LOG_FILE")  # default: stdout
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+# Records with the same logger, level and message template allowed per window; 0 disables.
+LOG_RATE_LIMIT = int(os.getenv("LOG_RATE_LIMIT", "20"))
+LOG_RATE_WINDOW_S = float(os.getenv("LOG_RATE_WINDOW_S", "1"))
+# Opt-in: stop the logging module collecting caller file:line, thread,
+# process and task names for every record. Process-wide, so it also empties
+# %(filename)s / %(lineno)d / %(threadName)s etc. for every other handler.
+LOG_LEAN_RECORDS = os.getenv("LOG_LEAN_RECORDS", "0") in {"1", "true", "True", "YES", "yes"}
+
+request_id_var: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("log_request_id", default=None)
+member_id_var: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("log_member_id", default=None)
+
+_STD_ATTRS = set(logging.LogRecord("", 0, "", 0, "", (), None).__dict__) | {
+    "message", "asctime", "request_id", "member_id",
+}
+
+
+def bind_log_context(
+    *, request_id: Optional[str] = None, member_id: Optional[str] = None
+) -> List[Tuple[contextvars.ContextVar, contextvars.Token]]:
+    """Attach correlation ids to every record logged from this context."""
+    tokens = []
+    if request_id is not None:
+        tokens.append((request_id_var, request_id_var.set(request_id)))
+    if member_id is not None:
+        tokens.append((member_id_var, member_id_var.set(member_id)))
+    return tokens
+
+
+def reset_log_context(tokens: List[Tuple[contextvars.ContextVar, contextvars.Token]]) -> None:
+    for var, token in reversed(tokens):
+        var.reset(token)
+
+
+class _BoundedQueueHandler(QueueHandler):
+    """
+    Runs in the caller's thread: stamp correlation ids and enqueue. No
+    formatting here (unlike the stdlib QueueHandler); a full queue drops
+    the record and counts it instead of blocking the event loop.
+    """
+
+    def __init__(self, q: "queue.SimpleQueue[Any]", maxsize: int) -> None:
+        super().__init__(q)
+        self.maxsize = maxsize
+        self.dropped = 0
+
+    def handle(self, record: logging.LogRecord) -> bool:
+        # Skip Handler.handle's lock + emit() indirection: the queue is thread-safe.
+        if not self.filter(record):
+            return False
+        self.enqueue(self.prepare(record))
+        return True
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record.request_id = request_id_var.get()
+        record.member_id = member_id_var.get()
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        # SimpleQueue is unbounded but far cheaper to put() than queue.Queue;
+        # the size check is approximate under contention, which is fine here.
+        if self.queue.qsize() >= self.maxsize:
+            self.dropped += 1
+            return
+        self.queue.put_nowait(record)
+
+
+class _BackgroundWriter(threading.Thread):
+    """Drains the queue in batches: format off the event loop, one write + flush per batch."""
+
+    _STOP = object()
+    _BATCH = 512
+
+    def __init__(self, q: "queue.SimpleQueue[Any]", stream: Any, formatter: logging.Formatter) -> None:
+        super().__init__(name="log-writer", daemon=True)
+        self.queue = q
+        self.stream = stream
+        self.formatter = formatter
+
+    def run(self) -> None:
+        while True:
+            batch = [self.queue.get()]
+            while len(batch) < self._BATCH:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+            stop = any(r is self._STOP for r in batch)
+            lines = []
+            for record in batch:
+                if record is self._STOP:
+                    continue
+                try:
+                    lines.append(self.formatter.format(record))
+                except Exception:
+                    lines.append(f"<unformattable log record from {record.name}>")
+            if lines:
+                try:
+                    self.stream.write("\n".join(lines) + "\n")
+                    self.stream.flush()
+                except Exception:
+                    pass
+            if stop:
+                return
+
+    def stop(self) -> None:
+        self.queue.put(self._STOP)
+        self.join()
+
+
+class RateLimitFilter(logging.Filter):
+    """Drop records from the same logger/level/template beyond `limit` per `window_s`."""
+
+    def __init__(self, limit: int = LOG_RATE_LIMIT, window_s: float = LOG_RATE_WINDOW_S) -> None:
+        super().__init__()
+        self.limit = limit
+        self.window_s = window_s
+        self.suppressed = 0
+        self._window_start = time.monotonic()
+        self._counts: Dict[Any, int] = {}
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if self.limit <= 0:
+            return True
+        now = time.monotonic()
+        if now - self._window_start >= self.window_s:
+            self._window_start = now
+            self._counts.clear()
+        # Keyed on the template, not its args: repeats of one call site
+        # (timings, per-error warnings) differ in args almost every time.
+        key = (record.name, record.levelno, record.msg)
+        try:
+            n = self._counts.get(key, 0) + 1
+        except TypeError:  # unhashable msg object
+            return True
+        self._counts[key] = n
+        if n > self.limit:
+            self.suppressed += 1
+            return False
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        doc: Dict[str, Any] = {
+            "ts": round(record.created, 6),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        if getattr(record, "request_id", None):
+            doc["request_id"] = record.request_id
+        if getattr(record, "member_id", None):
+            doc["member_id"] = record.member_id
+        for k, v in record.__dict__.items():
+            if k not in _STD_ATTRS:
+                doc[k] = v
+        if record.exc_info:
+            doc["exc"] = self.formatException(record.exc_info)
+        return json.dumps(doc, default=str, separators=(",", ":"))
+
+
+class _TextFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        line = super().format(record)
+        fields = [
+            f"{k}={getattr(record, k)}" for k in ("request_id", "member_id") if getattr(record, k, None)
+        ]
+        fields += [f"{k}={v}" for k, v in record.__dict__.items() if k not in _STD_ATTRS]
+        return f"{line} {' '.join(fields)}" if fields else line
+
+
+_handler: Optional[_BoundedQueueHandler] = None
+_rate_filter: Optional[RateLimitFilter] = None
+_listener: Optional[_BackgroundWriter] = None
+_saved_record_flags: Optional[Dict[str, Any]] = None
+_lock = threading.Lock()
+
+_RECORD_FLAGS = ("logProcesses", "logThreads", "logMultiprocessing", "logAsyncioTasks", "_srcfile")
+
+
+def _parse_levels(spec: str) -> Dict[str, str]:
+    levels = {}
+    for part in spec.split(","):
+        name, _, level = part.partition("=")
+        if name.strip() and level.strip():
+            levels[name.strip()] = level.strip().upper()
+    return levels
+
+
+def configure_logging(stream: Any = None, *, lean_records: bool = LOG_LEAN_RECORDS) -> None:
+    """
+    Install the bounded queue -> background writer pipeline on the root logger (idempotent).
+    Records go to `stream` if given, else LOG_FILE, else stdout. See LOG_LEAN_RECORDS
+    for `lean_records`; the previous settings are restored by shutdown_logging().
+    """
+    global _handler, _rate_filter, _listener, _saved_record_flags
+    with _lock:
+        if _listener is not None:
+            return
+        if stream is None:
+            stream = open(LOG_FILE, "a", encoding="utf-8") if LOG_FILE else sys.stdout
+        if LOG_FORMAT == "text":
+            formatter: logging.Formatter = _TextFormatter("%(asctime)s %(levelname)s %(name)s: %(message)s")
+        else:
+            formatter = JsonFormatter()
+
+        if lean_records:
+            # Our formatters never emit pid/thread/task names or caller
+            # file:line; findCaller walks the stack on every call while
+            # _srcfile is set.
+            _saved_record_flags = {f: getattr(logging, f) for f in _RECORD_FLAGS}
+            for f in _RECORD_FLAGS:
+                setattr(logging, f, None if f == "_srcfile" else False)
+
+        q: "queue.SimpleQueue[Any]" = queue.SimpleQueue()
+        _handler = _BoundedQueueHandler(q, LOG_QUEUE_SIZE)
+        _rate_filter = RateLimitFilter()
+        _handler.addFilter(_rate_filter)
+        _listener = _BackgroundWriter(q, stream, formatter)
+        _listener.start()
+        atexit.register(shutdown_logging)
+
+        root = logging.getLogger()
+        root.addHandler(_handler)
+        root.setLevel(LOG_LEVEL)
+        for name, level in _parse_levels(LOG_LEVELS).items():
+            logging.getLogger(name).setLevel(level)
+
+
+def shutdown_logging() -> None:
+    """Flush queued records and stop the writer thread."""
+    global _listener, _saved_record_flags
+    with _lock:
+        if _listener is None:
+            return
+        _listener.stop()
+        logging.getLogger().removeHandler(_handler)
+        _listener = None
+        if _saved_record_flags is not None:
+            for f, v in _saved_record_flags.items():
+                setattr(logging, f, v)
+            _saved_record_flags = None
+
+
+def logging_stats() -> Dict[str, Any]:
+    if _handler is None:
+        return {"configured": False}
+    return {
+        "configured": _listener is not None,
+        "queued": _handler.queue.qsize(),
+        "dropped": _handler.dropped,
+        "rate_limited": _rate_filter.suppressed if _rate_filter else 0,
+    }
@@ -0,0 +1,256 @@
+# app/telemetry/profiling.py
+from __future__ import annotations
+import os
+import sys
+import json
+import time
+import logging
+import random
+import asyncio
+import functools
+import threading
+import traceback
+import contextvars
+from collections import defaultdict
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+# ------------------------------------------------------------------
+# Config
+# ------------------------------------------------------------------
+# Event-loop blocking detector (opt-in: a heartbeat task plus a polling thread per worker).
+LOOP_MONITOR = os.getenv("LOOP_MONITOR", "0") in {"1", "true", "True", "YES", "yes"}
+LOOP_LAG_THRESHOLD_MS = float(os.getenv("LOOP_LAG_THRESHOLD_MS", "100"))
+LOOP_LAG_INTERVAL_MS = float(os.getenv("LOOP_LAG_INTERVAL_MS", "20"))
+# Per-request profiling: forced by the X-Profile request header, else sampled.
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+PROFILE_DUMP_DIR = os.getenv("PROFILE_DUMP_DIR")  # sampled profiles are written here as JSON
+
+_STACK_DEPTH = 12
+# Frames under this directory are "ours" when attributing a stall.
+_APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__))) + os.sep
+
+logger = logging.getLogger(__name__)
+
+
+# ------------------------------------------------------------------
+# Per-request node profiling
+# ------------------------------------------------------------------
+class RequestProfile:
+    """Wall / CPU time per graph node for one request."""
+
+    def __init__(self, *, forced: bool) -> None:
+        self.forced = forced
+        self.started = time.time()
+        self.nodes: List[Dict[str, Any]] = []
+
+    def add(self, node: str, wall_ms: float, cpu_ms: float) -> None:
+        self.nodes.append({"node": node, "wall_ms": round(wall_ms, 3), "cpu_ms": round(cpu_ms, 3)})
+
+    def server_timing(self) -> str:
+        """Render as a Server-Timing header value."""
+        return ", ".join(
+            f'{n["node"]};dur={n["wall_ms"]};desc="cpu={n["cpu_ms"]}ms"' for n in self.nodes
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"started": self.started, "nodes": self.nodes}
+
+
+_current_profile: contextvars.ContextVar[Optional[RequestProfile]] = contextvars.ContextVar(
+    "request_profile", default=None
+)
+
+# node -> [count, wall_ms, cpu_ms, max_wall_ms]
+_node_totals: Dict[str, List[float]] = defaultdict(lambda: [0, 0.0, 0.0, 0.0])
+_profiled_requests = 0
+
+
+def start_request_profile(forced: bool = False) -> Optional[contextvars.Token]:
+    """Begin profiling this request if forced or sampled; returns a token for finish_request_profile."""
+    if not forced and (PROFILE_SAMPLE_RATE <= 0 or random.random() >= PROFILE_SAMPLE_RATE):
+        return None
+    return _current_profile.set(RequestProfile(forced=forced))
+
+
+def finish_request_profile(token: Optional[contextvars.Token]) -> Optional[RequestProfile]:
+    global _profiled_requests
+    if token is None:
+        return None
+    profile = _current_profile.get()
+    _current_profile.reset(token)
+    if profile is None:
+        return None
+    _profiled_requests += 1
+    for n in profile.nodes:
+        totals = _node_totals[n["node"]]
+        totals[0] += 1
+        totals[1] += n["wall_ms"]
+        totals[2] += n["cpu_ms"]
+        totals[3] = max(totals[3], n["wall_ms"])
+    if PROFILE_DUMP_DIR and not profile.forced:
+        _dump(profile)
+    return profile
+
+
+def _dump(profile: RequestProfile) -> None:
+    """Write the profile from a worker thread: this is called on the event loop."""
+    doc = profile.to_dict()
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        _write_dump(profile.started, doc)
+        return
+    loop.run_in_executor(None, _write_dump, profile.started, doc)
+
+
+def _write_dump(started: float, doc: Dict[str, Any]) -> None:
+    try:
+        os.makedirs(PROFILE_DUMP_DIR, exist_ok=True)
+        path = os.path.join(PROFILE_DUMP_DIR, f"profile-{started:.6f}.json")
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(doc, f)
+    except OSError as e:
+        logger.warning("profile dump failed: %s", e)
+
+
+def profiled_node(name: str, fn: Callable[..., Awaitable[Any]]) -> Callable[..., Awaitable[Any]]:
+    """
+    Wrap a graph node so profiled requests record its wall and CPU time.
+    CPU time is loop-thread time, so it also counts other coroutines that
+    ran while this node was awaiting.
+    """
+
+    @functools.wraps(fn)
+    async def wrapper(*args: Any, **kwargs: Any) -> Any:
+        profile = _current_profile.get()
+        if profile is None:
+            return await fn(*args, **kwargs)
+        w0, c0 = time.perf_counter(), time.thread_time()
+        try:
+            return await fn(*args, **kwargs)
+        finally:
+            profile.add(name, (time.perf_counter() - w0) * 1000, (time.thread_time() - c0) * 1000)
+
+    return wrapper
+
+
+# ------------------------------------------------------------------
+# Event-loop lag monitor
+# ------------------------------------------------------------------
+class LoopLagMonitor:
+    """
+    A heartbeat coroutine stamps the time every interval; a watchdog thread
+    notices when the stamp goes stale and logs the loop thread's stack, i.e.
+    whatever is blocking the loop right now.
+    """
+
+    def __init__(
+        self,
+        threshold_ms: float = LOOP_LAG_THRESHOLD_MS,
+        interval_ms: float = LOOP_LAG_INTERVAL_MS,
+    ) -> None:
+        self.threshold_s = threshold_ms / 1000.0
+        self.interval_s = interval_ms / 1000.0
+        self._last_beat = time.monotonic()
+        self._loop_thread_id: Optional[int] = None
+        self._task: Optional[asyncio.Task] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self.stalls = 0
+        self.max_lag_ms = 0.0
+        # "file:line in func" of the innermost app frame -> [count, total_ms, sample stack]
+        self.blockers: Dict[str, List[Any]] = {}
+
+    async def _heartbeat(self) -> None:
+        while True:
+            self._last_beat = time.monotonic()
+            await asyncio.sleep(self.interval_s)
+
+    def _watch(self) -> None:
+        stall: Optional[List[Any]] = None  # [beat, site, last observed lag_ms]
+        while not self._stop.wait(self.interval_s):
+            beat = self._last_beat
+            lag_ms = (time.monotonic() - beat - self.interval_s) * 1000
+            if stall is not None and beat != stall[0]:
+                self._finish(stall[1], stall[2])
+                stall = None
+            if lag_ms < self.threshold_s * 1000:
+                continue
+            if stall is None:
+                frame = sys._current_frames().get(self._loop_thread_id)
+                stack = traceback.format_stack(frame, limit=_STACK_DEPTH) if frame else []
+                stall = [beat, self._begin(lag_ms, stack), lag_ms]
+            else:
+                stall[2] = lag_ms
+
+    def _begin(self, lag_ms: float, stack: List[str]) -> str:
+        site = _blocking_site(stack)
+        with self._lock:
+            self.stalls += 1
+            self.blockers.setdefault(site, [0, 0.0, stack])[0] += 1
+        logger.warning(
+            "event loop blocked >%.0f ms at %s", lag_ms, site, extra={"stack": "".join(stack)}
+        )
+        return site
+
+    def _finish(self, site: str, lag_ms: float) -> None:
+        with self._lock:
+            self.max_lag_ms = max(self.max_lag_ms, lag_ms)
+            self.blockers[site][1] += lag_ms
+
+    def start(self) -> None:
+        """Call from within the running loop."""
+        if self._task is not None:
+            return
+        self._loop_thread_id = threading.get_ident()
+        self._last_beat = time.monotonic()
+        self._stop.clear()
+        self._task = asyncio.get_running_loop().create_task(self._heartbeat())
+        self._thread = threading.Thread(target=self._watch, name="loop-lag-monitor", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            top = sorted(self.blockers.items(), key=lambda kv: kv[1][1], reverse=True)[:10]
+            return {
+                "threshold_ms": self.threshold_s * 1000,
+                "stalls": self.stalls,
+                "max_lag_ms": round(self.max_lag_ms, 1),
+                "top_blockers": [
+                    {"site": site, "count": c, "total_ms": round(ms, 1), "stack": stack}
+                    for site, (c, ms, stack) in top
+                ],
+            }
+
+
+def _blocking_site(stack: List[str]) -> str:
+    """Innermost frame from this repo, else the innermost frame overall."""
+    frames = [s.strip().splitlines()[0] for s in stack if s.strip()]
+    for line in reversed(frames):
+        if line.startswith(f'File "{_APP_DIR}'):
+            return line
+    return frames[-1] if frames else "<unknown>"
+
+
+loop_monitor = LoopLagMonitor()
+
+
+def hotspot_stats() -> Dict[str, Any]:
+    nodes = {
+        name: {
+            "count": int(c),
+            "wall_ms_mean": round(w / c, 3) if c else 0.0,
+            "cpu_ms_mean": round(cpu / c, 3) if c else 0.0,
+            "wall_ms_max": round(mx, 3),
+            "wall_ms_total": round(w, 3),
+        }
+        for name, (c, w, cpu, mx) in _node_totals.items()
+    }
+    return {"profiled_requests": _profiled_requests, "nodes": nodes, "loop": loop_monitor.stats()}
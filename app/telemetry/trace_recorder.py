@@ -0,0 +1,259 @@
+# app/telemetry/trace_recorder.py
+from __future__ import annotations
+import io
+import os
+import gzip
+import json
+import time
+import zlib
+import queue
+import random
+import asyncio
+import atexit
+import threading
+from collections import defaultdict
+from typing import Any, Awaitable, Callable, Dict, Iterator, List, Optional, Sequence, Tuple, Union
+
+from app.utils.render_cache import canonical_json, content_hash
+
+# ------------------------------------------------------------------
+# Config
+# ------------------------------------------------------------------
+# TRACE_MODE=off | record | replay   (default: off)
+#   record -> write upstream calls + inbound A2A requests to TRACE_FILE
+#   replay -> serve upstream calls from TRACE_FILE with recorded latencies
+TRACE_MODE = (os.getenv("TRACE_MODE") or "off").strip().lower()
+# record: `{pid}` / `{ts}` are expanded so every worker process and every
+# session gets its own file (an existing file is never appended to).
+# replay: one path, or several comma-separated (e.g. one per worker).
+TRACE_FILE = os.getenv("TRACE_FILE", "trace-{pid}-{ts}.jsonl.gz")
+TRACE_SEED = os.getenv("TRACE_SEED", "0")
+# The writer thread flushes at least this often, so a killed process loses
+# at most this much of its trace.
+TRACE_FLUSH_S = float(os.getenv("TRACE_FLUSH_S", "1"))
+
+# Trace file: gzip'd JSON lines, one record per line.
+#   {"k":"session","pid":<pid>,"wall":<unix time>}      first record of every file
+#   {"k":"blob","h":<hash>,"p":<payload>}                  payload, stored once per file
+#   {"k":"up","t":<s>,"ep":<endpoint>,"m":<member>,"ms":<latency>,"h":<hash>}
+#   {"k":"a2a","t":<s>,"h":{<headers>},"b":<request json>}
+# `t` is seconds since the session started (`wall`).
+
+# Values under these keys never reach the trace; replay serves the placeholder.
+_REDACTED_KEYS = {"access_token", "refresh_token", "id_token", "client_secret", "password"}
+REDACTED = "<redacted>"
+
+
+def redact(payload: Any) -> Any:
+    if isinstance(payload, dict):
+        return {
+            k: REDACTED if k in _REDACTED_KEYS and v is not None else redact(v)
+            for k, v in payload.items()
+        }
+    if isinstance(payload, list):
+        return [redact(v) for v in payload]
+    return payload
+
+
+def _record_path(template: str) -> str:
+    path = template.format(pid=os.getpid(), ts=time.strftime("%Y%m%dT%H%M%S"))
+    if os.path.dirname(path):
+        os.makedirs(os.path.dirname(path), mode=0o700, exist_ok=True)
+    return path
+
+
+def _open_private(path: str) -> io.TextIOWrapper:
+    """New gzip text file, mode 0600 (traces hold member payloads and request bodies); never reuses a file."""
+    raw = os.fdopen(os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600), "wb")
+    return io.TextIOWrapper(gzip.GzipFile(fileobj=raw, mode="wb"), encoding="utf-8")
+
+
+class TraceWriter:
+    """
+    Callers only enqueue; a background thread hashes, serializes, compresses
+    and writes, and sync-flushes the gzip stream every TRACE_FLUSH_S so the
+    file stays readable up to the last flush if the process dies.
+    """
+
+    _STOP = object()
+
+    def __init__(self, path: str, flush_s: float = TRACE_FLUSH_S) -> None:
+        self.path = path
+        self.flush_s = flush_s
+        self._f = _open_private(path)
+        self._q: "queue.SimpleQueue[Any]" = queue.SimpleQueue()
+        self._t0 = time.monotonic()
+        self._blobs: set = set()
+        self._write({"k": "session", "pid": os.getpid(), "wall": round(time.time(), 6)})
+        self._thread = threading.Thread(target=self._run, name="trace-writer", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def _now(self) -> float:
+        return round(time.monotonic() - self._t0, 6)
+
+    def _write(self, rec: Dict[str, Any]) -> None:
+        self._f.write(json.dumps(rec, separators=(",", ":"), default=str))
+        self._f.write("\n")
+
+    def upstream(self, endpoint: str, member_id: Optional[str], ms: float, payload: Any) -> None:
+        self._q.put(("up", self._now(), endpoint, member_id, ms, payload))
+
+    def a2a(self, headers: Dict[str, str], body: Any) -> None:
+        self._q.put(("a2a", self._now(), headers, body))
+
+    def _handle(self, item: Tuple[Any, ...]) -> None:
+        if item[0] == "a2a":
+            _, t, headers, body = item
+            self._write({"k": "a2a", "t": t, "h": headers, "b": body})
+            return
+        _, t, endpoint, member_id, ms, payload = item
+        payload = redact(payload)
+        h = content_hash(canonical_json(payload))
+        if h not in self._blobs:
+            self._blobs.add(h)
+            self._write({"k": "blob", "h": h, "p": payload})
+        self._write({"k": "up", "t": t, "ep": endpoint, "m": member_id, "ms": round(ms, 3), "h": h})
+
+    def _run(self) -> None:
+        next_flush = time.monotonic() + self.flush_s
+        dirty = False
+        while True:
+            try:
+                item = self._q.get(timeout=max(0.0, next_flush - time.monotonic()))
+            except queue.Empty:
+                item = None
+            if item is self._STOP:
+                raw = self._f.buffer.fileobj
+                self._f.close()  # GzipFile leaves a passed-in fileobj open
+                raw.close()
+                return
+            if item is not None:
+                self._handle(item)
+                dirty = True
+            if dirty and time.monotonic() >= next_flush:
+                self._f.flush()
+                self._f.buffer.flush(zlib.Z_SYNC_FLUSH)
+                dirty = False
+            if time.monotonic() >= next_flush:
+                next_flush = time.monotonic() + self.flush_s
+
+    def close(self) -> None:
+        if self._thread.is_alive():
+            self._q.put(self._STOP)
+            self._thread.join()
+
+
+def read_trace(path: str) -> Iterator[Dict[str, Any]]:
+    """Records in file order; a truncated tail (killed recorder) ends the stream."""
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        try:
+            for line in f:
+                if not line.endswith("\n"):
+                    return
+                if line.strip():
+                    yield json.loads(line)
+        except (EOFError, gzip.BadGzipFile, zlib.error):
+            return
+
+
+def _paths(path: Union[str, Sequence[str]]) -> List[str]:
+    if isinstance(path, str):
+        return [p.strip() for p in path.split(",") if p.strip()]
+    return list(path)
+
+
+def load_a2a_requests(path: Union[str, Sequence[str]]) -> List[Dict[str, Any]]:
+    """
+    Recorded inbound requests from one or more trace files, ordered by
+    arrival. `t` is rebased onto the earliest session start so files from
+    several workers share one timeline.
+    """
+    sessions = []
+    for p in _paths(path):
+        wall, reqs = 0.0, []
+        for r in read_trace(p):
+            if r.get("k") == "session":
+                wall = r["wall"]
+            elif r.get("k") == "a2a":
+                reqs.append(r)
+        sessions.append((wall, reqs))
+    if not sessions:
+        return []
+    base = min(wall for wall, _ in sessions)
+    out = []
+    for wall, reqs in sessions:
+        out.extend({**r, "t": r["t"] + wall - base} for r in reqs)
+    return sorted(out, key=lambda r: r["t"])
+
+
+class TracePlayer:
+    """Serves recorded upstream payloads, sleeping a latency drawn from the endpoint's recorded ones."""
+
+    def __init__(self, path: Union[str, Sequence[str]], seed: Any = TRACE_SEED) -> None:
+        self._rng = random.Random(seed)
+        self._payloads: Dict[Tuple[str, Optional[str]], Any] = {}
+        self._any_payload: Dict[str, Any] = {}
+        self._latencies: Dict[str, List[float]] = defaultdict(list)
+        for p in _paths(path):
+            blobs: Dict[str, Any] = {}
+            for rec in read_trace(p):
+                kind = rec.get("k")
+                if kind == "blob":
+                    blobs[rec["h"]] = rec["p"]
+                elif kind == "up":
+                    payload = blobs.get(rec["h"])
+                    self._payloads[(rec["ep"], rec.get("m"))] = payload
+                    self._any_payload.setdefault(rec["ep"], payload)
+                    self._latencies[rec["ep"]].append(rec["ms"])
+
+    async def play(self, endpoint: str, member_id: Optional[str]) -> Any:
+        samples = self._latencies.get(endpoint)
+        if not samples:
+            raise KeyError(f"no recorded calls for upstream '{endpoint}' in trace")
+        await asyncio.sleep(self._rng.choice(samples) / 1000.0)
+        payload = self._payloads.get((endpoint, member_id))
+        return payload if payload is not None else self._any_payload[endpoint]
+
+
+_writer: Optional[TraceWriter] = None
+_player: Optional[TracePlayer] = None
+
+
+def get_writer() -> Optional[TraceWriter]:
+    global _writer
+    if TRACE_MODE != "record":
+        return None
+    if _writer is None:
+        _writer = TraceWriter(_record_path(TRACE_FILE))
+    return _writer
+
+
+def get_player() -> Optional[TracePlayer]:
+    global _player
+    if TRACE_MODE != "replay":
+        return None
+    if _player is None:
+        _player = TracePlayer(TRACE_FILE)
+    return _player
+
+
+def traced_upstream(
+    endpoint: str, member_id: Optional[str], factory: Callable[[], Awaitable[Any]]
+) -> Callable[[], Awaitable[Any]]:
+    """Wrap an upstream call factory for TRACE_MODE record/replay; unchanged when off."""
+    if TRACE_MODE == "off":
+        return factory
+
+    async def run() -> Any:
+        player = get_player()
+        if player is not None:
+            return await player.play(endpoint, member_id)
+        t0 = time.perf_counter()
+        payload = await factory()
+        writer = get_writer()
+        if writer is not None:
+            writer.upstream(endpoint, member_id, (time.perf_counter() - t0) * 1000, payload)
+        return payload
+
+    return run
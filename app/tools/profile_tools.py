@@ -1,8 +1,16 @@
 from __future__ import annotations
 import os
 import time
+import logging
 import asyncio
-from typing import Any, Dict
+import random
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from app.tools.resilience import call_upstream
+from app.utils.cache_store import MemoryCacheStore, get_cache_store
+from app.telemetry.trace_recorder import traced_upstream
+
+logger = logging.getLogger(__name__)
 
 # ------------------------------------------------------------------
 # Config (mocks)
@@ -15,15 +23,53 @@ PREF_USERNM = os.getenv("PROFILE_USERNM", "test")
 
 # Optional simulated latency (milliseconds). Default 0.
 MOCK_DELAY_MS = int(os.getenv("MOCK_DELAY_MS", "0"))
+# Delay distribution around MOCK_DELAY_MS:
+#   fixed     -> always MOCK_DELAY_MS
+#   lognormal -> median MOCK_DELAY_MS, spread MOCK_DELAY_SIGMA
+#   pareto    -> minimum MOCK_DELAY_MS, tail index MOCK_DELAY_ALPHA (lower = heavier)
+MOCK_DELAY_DIST = (os.getenv("MOCK_DELAY_DIST") or "fixed").strip().lower()
+MOCK_DELAY_SIGMA = float(os.getenv("MOCK_DELAY_SIGMA", "1.0"))
+MOCK_DELAY_ALPHA = float(os.getenv("MOCK_DELAY_ALPHA", "1.5"))
+# Fraction of mocked upstream calls that fail (exercises the circuit breaker).
+MOCK_ERROR_RATE = float(os.getenv("MOCK_ERROR_RATE", "0"))
+
+_rng = random.Random(os.getenv("MOCK_DELAY_SEED"))
+
+# Cache TTLs (seconds); 0 disables. Member payloads are opt-in since they can
+# change upstream. The bearer token is cached per process only (never in the
+# shared store), and never past its `expires_in` minus TOKEN_EXPIRY_SKEW_S.
+TOKEN_CACHE_TTL_S = float(os.getenv("TOKEN_CACHE_TTL_S", "300"))
+TOKEN_EXPIRY_SKEW_S = float(os.getenv("TOKEN_EXPIRY_SKEW_S", "30"))
+PROFILE_CACHE_TTL_S = float(os.getenv("PROFILE_CACHE_TTL_S", "0"))
+
+class UpstreamError(RuntimeError):
+    """Simulated upstream failure."""
+
+def seed_mock(seed: Any) -> None:
+    """Re-seed the mock delay/error generator (reproducible benchmarks)."""
+    _rng.seed(seed)
+
+def _mock_delay_s() -> float:
+    if MOCK_DELAY_MS <= 0:
+        return 0.0
+    base = MOCK_DELAY_MS / 1000.0
+    if MOCK_DELAY_DIST == "lognormal":
+        return base * _rng.lognormvariate(0.0, MOCK_DELAY_SIGMA)
+    if MOCK_DELAY_DIST == "pareto":
+        return base * _rng.paretovariate(MOCK_DELAY_ALPHA)
+    return base
 
 async def _maybe_sleep() -> None:
-    if MOCK_DELAY_MS > 0:
-        await asyncio.sleep(MOCK_DELAY_MS / 1000.0)
+    delay = _mock_delay_s()
+    if delay > 0:
+        await asyncio.sleep(delay)
+    if MOCK_ERROR_RATE > 0 and _rng.random() < MOCK_ERROR_RATE:
+        raise UpstreamError("mock upstream failure")
 
 # ------------------------------------------------------------------
 # Mock payloads
 # ------------------------------------------------------------------
-ACCESS = {"access_token": "tbd"}
+ACCESS = {"access_token": "tbd", "token_type": "Bearer", "expires_in": 3600}
 
 EMAIL = {
     "email": [{
@@ -62,63 +108,99 @@ PREFS = {
 # ------------------------------------------------------------------
 # Async "HTTP" helpers (mocked)
 # ------------------------------------------------------------------
-async def _get_access_token_async() -> str:
+async def _get_access_token_async() -> Dict[str, Any]:
     t0 = time.perf_counter()
     await _maybe_sleep()
-    token = ACCESS["access_token"]
-    print(f"[timing] access_token: {(time.perf_counter() - t0)*1000:.1f} ms")
-    return token
+    logger.debug("access_token: %.1f ms", (time.perf_counter() - t0)*1000)
+    return ACCESS
 
 async def _get_email_async(member_id: str, bearer: str) -> Dict[str, Any]:
     t0 = time.perf_counter()
     await _maybe_sleep()
-    print(f"[timing] GET email(member_id={member_id}): {(time.perf_counter() - t0)*1000:.1f} ms")
+    logger.debug("GET email(member_id=%s): %.1f ms", member_id, (time.perf_counter() - t0)*1000)
     return EMAIL
 
 async def _get_address_async(member_id: str, bearer: str) -> Dict[str, Any]:
     t0 = time.perf_counter()
     await _maybe_sleep()
-    print(f"[timing] GET address(member_id={member_id}): {(time.perf_counter() - t0)*1000:.1f} ms")
+    logger.debug("GET address(member_id=%s): %.1f ms", member_id, (time.perf_counter() - t0)*1000)
     return ADDR
 
 async def _get_preferences_async(member_id: str, bearer: str) -> Dict[str, Any]:
     t0 = time.perf_counter()
     await _maybe_sleep()
-    print(f"[timing] GET preferences(member_id={member_id}): {(time.perf_counter() - t0)*1000:.1f} ms")
+    logger.debug("GET preferences(member_id=%s): %.1f ms", member_id, (time.perf_counter() - t0)*1000)
     return PREFS
 
+async def _cached_upstream(
+    endpoint: str, key: str, ttl_s: float, factory: Callable[[], Awaitable[Any]],
+    *, member_id: Optional[str] = None,
+) -> Any:
+    """Serve from the (possibly cross-worker) cache store, else call the upstream."""
+    # TRACE_MODE=record|replay captures / plays back the actual upstream call.
+    factory = traced_upstream(endpoint, member_id, factory)
+    if ttl_s <= 0:
+        return await call_upstream(endpoint, factory)
+    store = get_cache_store()
+    value = await store.aget(key)
+    if value is None:
+        value = await call_upstream(endpoint, factory)
+        await store.aset(key, value, ttl_s)
+    return value
+
+_token_cache = MemoryCacheStore(max_entries=1)
+
+async def _get_token_cached() -> str:
+    token = _token_cache.get("token:access")
+    if token is None:
+        resp = await call_upstream(
+            "access_token", traced_upstream("access_token", None, _get_access_token_async)
+        )
+        token = resp["access_token"]
+        ttl_s = TOKEN_CACHE_TTL_S
+        if resp.get("expires_in") is not None:
+            ttl_s = min(ttl_s, float(resp["expires_in"]) - TOKEN_EXPIRY_SKEW_S)
+        _token_cache.set("token:access", token, ttl_s)
+    return token
+
 # ------------------------------------------------------------------
 # Public async tool-like functions (use asyncio.gather for concurrency)
+# Upstream calls go through call_upstream() for hedging + circuit breaking.
 # ------------------------------------------------------------------
 async def fetch_email_and_address_async(*, member_id: str) -> Dict[str, Any]:
     t0 = time.perf_counter()
-    token = await _get_access_token_async()
+    token = await _get_token_cached()
     t1 = time.perf_counter()
     start = time.perf_counter()
     email_json, address_json = await asyncio.gather(
-        _get_email_async(member_id, token),
-        _get_address_async(member_id, token),
+        _cached_upstream(
+            "email", f"member:email:{member_id}", PROFILE_CACHE_TTL_S,
+            lambda: _get_email_async(member_id, token), member_id=member_id,
+        ),
+        _cached_upstream(
+            "address", f"member:address:{member_id}", PROFILE_CACHE_TTL_S,
+            lambda: _get_address_async(member_id, token), member_id=member_id,
+        ),
     )
     t3 = time.perf_counter()
-    print(
-        "[timing] tool.fetch_email_and_address(async): "
-        f"token={(t1 - t0)*1000:.1f} ms, "
-        f"await_both={(t3 - start)*1000:.1f} ms, "
-        f"total={(t3 - t0)*1000:.1f} ms"
+    logger.debug(
+        "tool.fetch_email_and_address(async): token=%.1f ms, await_both=%.1f ms, total=%.1f ms",
+        (t1 - t0)*1000, (t3 - start)*1000, (t3 - t0)*1000,
     )
     return {"email_json": email_json, "address_json": address_json}
 
 async def fetch_contact_preference_async(*, member_id: str) -> Dict[str, Any]:
     t0 = time.perf_counter()
-    token = await _get_access_token_async()
+    token = await _get_token_cached()
     t1 = time.perf_counter()
-    prefs = await _get_preferences_async(member_id, token)
+    prefs = await _cached_upstream(
+        "preferences", f"member:preferences:{member_id}", PROFILE_CACHE_TTL_S,
+        lambda: _get_preferences_async(member_id, token), member_id=member_id,
+    )
     t2 = time.perf_counter()
-    print(
-        "[timing] tool.fetch_contact_preference(async): "
-        f"token={(t1 - t0)*1000:.1f} ms, "
-        f"prefs={(t2 - t1)*1000:.1f} ms, "
-        f"total={(t2 - t0)*1000:.1f} ms"
+    logger.debug(
+        "tool.fetch_contact_preference(async): token=%.1f ms, prefs=%.1f ms, total=%.1f ms",
+        (t1 - t0)*1000, (t2 - t1)*1000, (t2 - t0)*1000,
     )
     return {"preferences_json": prefs}
 
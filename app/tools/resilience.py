@@ -0,0 +1,286 @@
+from __future__ import annotations
+import os
+import time
+import asyncio
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, Optional, TypeVar
+
+T = TypeVar("T")
+
+# ------------------------------------------------------------------
+# Config
+# ------------------------------------------------------------------
+# Hedging: when a call has not returned by the endpoint's recent latency
+# percentile, fire one duplicate and take whichever finishes first.
+HEDGE_ENABLED = os.getenv("HEDGE_ENABLED", "0").strip().lower() in {"1", "true", "yes"}
+HEDGE_PERCENTILE = float(os.getenv("HEDGE_PERCENTILE", "95"))
+HEDGE_MIN_DELAY_MS = float(os.getenv("HEDGE_MIN_DELAY_MS", "5"))
+HEDGE_MIN_SAMPLES = int(os.getenv("HEDGE_MIN_SAMPLES", "20"))
+HEDGE_WINDOW = int(os.getenv("HEDGE_WINDOW", "200"))
+# Extra load cap: every primary call earns BUDGET_RATIO hedge tokens (up to BURST).
+# The bucket starts empty, so hedges never exceed RATIO of calls made so far.
+HEDGE_BUDGET_RATIO = float(os.getenv("HEDGE_BUDGET_RATIO", "0.1"))
+HEDGE_BUDGET_BURST = float(os.getenv("HEDGE_BUDGET_BURST", "10"))
+
+# Circuit breaker: after N consecutive failures, fail fast for RESET_MS,
+# then let a single trial call through (half-open).
+CB_FAILURE_THRESHOLD = int(os.getenv("CB_FAILURE_THRESHOLD", "5"))
+CB_RESET_TIMEOUT_MS = float(os.getenv("CB_RESET_TIMEOUT_MS", "5000"))
+
+# Per-attempt upper bound so callers never pile up behind a hung upstream. 0 disables.
+UPSTREAM_TIMEOUT_MS = float(os.getenv("UPSTREAM_TIMEOUT_MS", "2000"))
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised instead of calling an upstream whose breaker is open."""
+
+    def __init__(self, endpoint: str, retry_after_s: float = CB_RESET_TIMEOUT_MS / 1000.0):
+        super().__init__(f"circuit open for upstream '{endpoint}'")
+        self.endpoint = endpoint
+        self.retry_after_s = retry_after_s
+
+
+# ------------------------------------------------------------------
+# Building blocks
+# ------------------------------------------------------------------
+class LatencyWindow:
+    """
+    Rolling window of recent call latencies (ms): successes, plus the elapsed
+    time of cancelled (hedge losers) and timed-out attempts as a lower bound.
+    """
+
+    def __init__(self, size: int = HEDGE_WINDOW, min_samples: int = HEDGE_MIN_SAMPLES):
+        self._samples: Deque[float] = deque(maxlen=max(1, size))
+        self._min_samples = min_samples
+
+    def observe(self, ms: float) -> None:
+        self._samples.append(ms)
+
+    def percentile(self, q: float) -> Optional[float]:
+        """Return the q-th percentile, or None until enough samples exist."""
+        n = len(self._samples)
+        if n == 0 or n < self._min_samples:
+            return None
+        ordered = sorted(self._samples)
+        idx = min(n - 1, max(0, int(round(q / 100.0 * n)) - 1))
+        return ordered[idx]
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+
+class HedgeBudget:
+    """Token bucket capping hedges to a fraction of primary calls."""
+
+    def __init__(self, ratio: float = HEDGE_BUDGET_RATIO, burst: float = HEDGE_BUDGET_BURST):
+        self.ratio = ratio
+        self.burst = burst
+        self._tokens = 0.0
+
+    def earn(self) -> None:
+        self._tokens = min(self.burst, self._tokens + self.ratio)
+
+    def try_spend(self) -> bool:
+        if self._tokens >= 1.0:
+            self._tokens -= 1.0
+            return True
+        return False
+
+
+class CircuitBreaker:
+    """Consecutive-failure breaker: closed -> open -> half_open -> closed."""
+
+    def __init__(
+        self,
+        failure_threshold: int = CB_FAILURE_THRESHOLD,
+        reset_timeout_ms: float = CB_RESET_TIMEOUT_MS,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout_s = reset_timeout_ms / 1000.0
+        self._clock = clock
+        self.state = "closed"
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+
+    def allow(self) -> bool:
+        if self.failure_threshold <= 0 or self.state == "closed":
+            return True
+        if self.state == "open":
+            if self._clock() - self._opened_at < self.reset_timeout_s:
+                return False
+            self.state = "half_open"
+        # half_open: exactly one trial call at a time
+        if self._trial_in_flight:
+            return False
+        self._trial_in_flight = True
+        return True
+
+    def record_success(self) -> None:
+        self.state = "closed"
+        self._failures = 0
+        self._trial_in_flight = False
+
+    def retry_after_s(self) -> float:
+        """Seconds until an open breaker lets a trial call through (0 unless open)."""
+        if self.state != "open":
+            return 0.0
+        return max(0.0, self.reset_timeout_s - (self._clock() - self._opened_at))
+
+    def release(self) -> None:
+        """Free a half-open trial slot without recording an outcome (caller cancelled)."""
+        self._trial_in_flight = False
+
+    def record_failure(self) -> None:
+        self._trial_in_flight = False
+        self._failures += 1
+        if self.state == "half_open" or (
+            self.failure_threshold > 0 and self._failures >= self.failure_threshold
+        ):
+            self.state = "open"
+            self._opened_at = self._clock()
+
+
+# ------------------------------------------------------------------
+# Per-endpoint policy
+# ------------------------------------------------------------------
+class UpstreamPolicy:
+    """Hedging + circuit breaking state for a single upstream endpoint."""
+
+    def __init__(
+        self,
+        endpoint: str,
+        *,
+        hedge_enabled: bool = HEDGE_ENABLED,
+        hedge_percentile: float = HEDGE_PERCENTILE,
+        hedge_min_delay_ms: float = HEDGE_MIN_DELAY_MS,
+        budget: Optional[HedgeBudget] = None,
+        breaker: Optional[CircuitBreaker] = None,
+        latency: Optional[LatencyWindow] = None,
+        timeout_ms: float = UPSTREAM_TIMEOUT_MS,
+    ):
+        self.endpoint = endpoint
+        self.hedge_enabled = hedge_enabled
+        self.hedge_percentile = hedge_percentile
+        self.hedge_min_delay_ms = hedge_min_delay_ms
+        self.budget = budget or HedgeBudget()
+        self.breaker = breaker or CircuitBreaker()
+        self.latency = latency or LatencyWindow()
+        self.timeout_ms = timeout_ms
+        self.calls = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+        self.failures = 0
+        self.rejected = 0
+
+    def hedge_delay_s(self) -> Optional[float]:
+        if not self.hedge_enabled:
+            return None
+        p = self.latency.percentile(self.hedge_percentile)
+        if p is None:
+            return None
+        return max(p, self.hedge_min_delay_ms) / 1000.0
+
+    async def _attempt(self, factory: Callable[[], Awaitable[T]]) -> T:
+        t0 = time.perf_counter()
+        try:
+            if self.timeout_ms > 0:
+                result = await asyncio.wait_for(factory(), self.timeout_ms / 1000.0)
+            else:
+                result = await factory()
+        except (asyncio.CancelledError, asyncio.TimeoutError):
+            # Slow attempts that lost a hedge race (or timed out) still count,
+            # as at least their elapsed time. Learning only from winners would
+            # drag the percentile down and make hedges fire ever earlier.
+            self.latency.observe((time.perf_counter() - t0) * 1000)
+            raise
+        self.latency.observe((time.perf_counter() - t0) * 1000)
+        return result
+
+    async def _race(self, factory: Callable[[], Awaitable[T]]) -> T:
+        primary = asyncio.ensure_future(self._attempt(factory))
+        pending = {primary}
+        try:
+            delay = self.hedge_delay_s()
+            if delay is not None:
+                done, _ = await asyncio.wait(pending, timeout=delay)
+                if not done and self.budget.try_spend():
+                    self.hedges += 1
+                    pending.add(asyncio.ensure_future(self._attempt(factory)))
+            last_exc: Optional[BaseException] = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    exc = task.exception()
+                    if exc is None:
+                        if task is not primary:
+                            self.hedge_wins += 1
+                        return task.result()
+                    last_exc = exc
+            assert last_exc is not None
+            raise last_exc
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def call(self, factory: Callable[[], Awaitable[T]]) -> T:
+        if not self.breaker.allow():
+            self.rejected += 1
+            raise CircuitOpenError(self.endpoint, self.breaker.retry_after_s())
+        self.calls += 1
+        self.budget.earn()
+        try:
+            result = await self._race(factory)
+        except asyncio.CancelledError:
+            # Caller gave up; not the upstream's fault.
+            self.breaker.release()
+            raise
+        except Exception:
+            self.failures += 1
+            self.breaker.record_failure()
+            raise
+        self.breaker.record_success()
+        return result
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "state": self.breaker.state,
+            "calls": self.calls,
+            "hedges": self.hedges,
+            "hedge_wins": self.hedge_wins,
+            "failures": self.failures,
+            "rejected": self.rejected,
+            "p50_ms": self.latency.percentile(50),
+            "p95_ms": self.latency.percentile(95),
+        }
+
+
+_policies: Dict[str, UpstreamPolicy] = {}
+_policy_overrides: Dict[str, Any] = {}
+
+
+def get_policy(endpoint: str) -> UpstreamPolicy:
+    policy = _policies.get(endpoint)
+    if policy is None:
+        policy = _policies[endpoint] = UpstreamPolicy(endpoint, **_policy_overrides)
+    return policy
+
+
+def reset_policies(**overrides: Any) -> None:
+    """Drop all per-endpoint state; new policies are built with `overrides` (for benchmarks)."""
+    _policies.clear()
+    _policy_overrides.clear()
+    _policy_overrides.update(overrides)
+
+
+def upstream_stats() -> Dict[str, Dict[str, Any]]:
+    return {name: p.stats() for name, p in _policies.items()}
+
+
+async def call_upstream(endpoint: str, factory: Callable[[], Awaitable[T]]) -> T:
+    """
+    Run `factory()` under the endpoint's policy.
+    `factory` must return a fresh awaitable each call so a hedge can be issued.
+    """
+    return await get_policy(endpoint).call(factory)
@@ -0,0 +1,289 @@
+from __future__ import annotations
+import os
+import abc
+import time
+import asyncio
+import logging
+import marshal
+import sqlite3
+import tempfile
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+# ------------------------------------------------------------------
+# Config
+# ------------------------------------------------------------------
+# CACHE_BACKEND=memory | sqlite | none   (default: memory)
+#   memory -> per-process LRU
+#   sqlite -> host-local file shared by every worker process (WAL mode)
+CACHE_BACKEND = (os.getenv("CACHE_BACKEND") or "memory").strip().lower()
+# Entries include member PII. The file (and its -wal/-shm siblings) is
+# created 0600; the default location is a 0700 per-user directory.
+CACHE_SQLITE_PATH = os.getenv("CACHE_SQLITE_PATH")
+CACHE_MAX_ENTRIES = int(os.getenv("CACHE_MAX_ENTRIES", "10000"))
+# How long a sqlite call waits on another worker's write lock before the
+# lookup counts as a miss (or the write is skipped). Keep it short: a cache
+# should never be slower than the upstream it fronts.
+CACHE_SQLITE_BUSY_MS = int(os.getenv("CACHE_SQLITE_BUSY_MS", "50"))
+
+logger = logging.getLogger(__name__)
+
+_MISSING = object()
+
+
+def _dumps(value: Any) -> bytes:
+    # marshal: fast, compact binary for plain JSON-like data. It is not safe
+    # against untrusted input and its format is tied to the Python version,
+    # so this relies on the cache file being private to the service and on
+    # every worker sharing it running the same interpreter.
+    return marshal.dumps(value)
+
+
+def _loads(blob: bytes) -> Any:
+    return marshal.loads(blob)
+
+
+class CacheStore(abc.ABC):
+    """
+    Key/value cache with per-entry TTL. Subclasses implement _get/_set/_delete.
+    Async callers use aget/aset, which backends doing blocking I/O run off the
+    event loop.
+    """
+
+    def __init__(self) -> None:
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str, default: Any = None) -> Any:
+        value = self._get(key)
+        if value is _MISSING:
+            self.misses += 1
+            return default
+        self.hits += 1
+        return value
+
+    def set(self, key: str, value: Any, ttl_s: float) -> None:
+        if ttl_s <= 0:
+            return
+        self._set(key, _dumps(value), time.time() + ttl_s)
+
+    def delete(self, key: str) -> None:
+        self._delete(key)
+
+    async def aget(self, key: str, default: Any = None) -> Any:
+        return self.get(key, default)
+
+    async def aset(self, key: str, value: Any, ttl_s: float) -> None:
+        self.set(key, value, ttl_s)
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "backend": type(self).__name__,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / total if total else 0.0,
+        }
+
+    @abc.abstractmethod
+    def _get(self, key: str) -> Any:
+        """Return the stored value, or _MISSING if absent or expired."""
+
+    @abc.abstractmethod
+    def _set(self, key: str, blob: bytes, expires: float) -> None: ...
+
+    @abc.abstractmethod
+    def _delete(self, key: str) -> None: ...
+
+
+class NullCacheStore(CacheStore):
+    """CACHE_BACKEND=none: every lookup misses."""
+
+    def _get(self, key: str) -> Any:
+        return _MISSING
+
+    def _set(self, key: str, blob: bytes, expires: float) -> None:
+        pass
+
+    def _delete(self, key: str) -> None:
+        pass
+
+
+class MemoryCacheStore(CacheStore):
+    """In-process LRU bounded by entry count."""
+
+    def __init__(self, max_entries: int = CACHE_MAX_ENTRIES) -> None:
+        super().__init__()
+        self.max_entries = max_entries
+        self._data: "OrderedDict[str, Tuple[bytes, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _get(self, key: str) -> Any:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return _MISSING
+            blob, expires = entry
+            if expires < time.time():
+                del self._data[key]
+                return _MISSING
+            self._data.move_to_end(key)
+        return _loads(blob)
+
+    def _set(self, key: str, blob: bytes, expires: float) -> None:
+        with self._lock:
+            self._data[key] = (blob, expires)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def _delete(self, key: str) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+
+
+def _default_sqlite_path() -> str:
+    base = os.getenv("XDG_RUNTIME_DIR") or tempfile.gettempdir()
+    d = os.path.join(base, f"profile-lg-lf-{os.getuid()}")
+    os.makedirs(d, mode=0o700, exist_ok=True)
+    st = os.stat(d)
+    if st.st_uid != os.getuid() or st.st_mode & 0o077:
+        raise PermissionError(f"cache directory {d} must be owned by this user with mode 0700")
+    return os.path.join(d, "cache.sqlite")
+
+
+def create_private_file(path: str) -> None:
+    """Create `path` 0600 (or tighten an existing file) before sqlite opens it;
+    sqlite gives the -wal/-shm files the database file's permissions."""
+    fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+    try:
+        os.fchmod(fd, 0o600)
+    finally:
+        os.close(fd)
+
+
+class SqliteCacheStore(CacheStore):
+    """
+    Host-local cache shared across worker processes via one SQLite file in
+    WAL mode (readers never block the writer). Size is bounded by entry count;
+    when over the bound the oldest-written entries are dropped.
+
+    sqlite3 calls block, so aget/aset run them in a worker thread. If another
+    process holds the write lock for longer than CACHE_SQLITE_BUSY_MS the
+    lookup is a miss and the write is dropped.
+    """
+
+    _PRUNE_EVERY = 256
+
+    def __init__(
+        self,
+        path: Optional[str] = CACHE_SQLITE_PATH,
+        max_entries: int = CACHE_MAX_ENTRIES,
+        busy_ms: int = CACHE_SQLITE_BUSY_MS,
+    ) -> None:
+        super().__init__()
+        self.path = path = path or _default_sqlite_path()
+        self.max_entries = max_entries
+        self.contended = 0
+        self._lock = threading.Lock()
+        self._writes = 0
+        create_private_file(path)
+        self._conn = sqlite3.connect(
+            path, timeout=busy_ms / 1000.0, check_same_thread=False, isolation_level=None
+        )
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS kv ("
+            " key TEXT PRIMARY KEY, value BLOB NOT NULL,"
+            " expires REAL NOT NULL, written REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS kv_written ON kv(written)")
+
+    async def aget(self, key: str, default: Any = None) -> Any:
+        return await asyncio.to_thread(self.get, key, default)
+
+    async def aset(self, key: str, value: Any, ttl_s: float) -> None:
+        if ttl_s > 0:
+            await asyncio.to_thread(self.set, key, value, ttl_s)
+
+    def _contended(self, op: str, e: sqlite3.OperationalError) -> bool:
+        msg = str(e).lower()
+        if "locked" not in msg and "busy" not in msg:
+            return False
+        self.contended += 1
+        logger.debug("cache %s skipped: %s", op, e)
+        return True
+
+    def _get(self, key: str) -> Any:
+        try:
+            with self._lock:
+                row = self._conn.execute(
+                    "SELECT value, expires FROM kv WHERE key = ?", (key,)
+                ).fetchone()
+        except sqlite3.OperationalError as e:
+            if self._contended("get", e):
+                return _MISSING
+            raise
+        if row is None or row[1] < time.time():
+            return _MISSING
+        return _loads(row[0])
+
+    def _set(self, key: str, blob: bytes, expires: float) -> None:
+        try:
+            with self._lock:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO kv (key, value, expires, written) VALUES (?, ?, ?, ?)",
+                    (key, blob, expires, time.time()),
+                )
+                self._writes += 1
+                if self._writes % self._PRUNE_EVERY == 0:
+                    self._prune()
+        except sqlite3.OperationalError as e:
+            if not self._contended("set", e):
+                raise
+
+    def _delete(self, key: str) -> None:
+        try:
+            with self._lock:
+                self._conn.execute("DELETE FROM kv WHERE key = ?", (key,))
+        except sqlite3.OperationalError as e:
+            if not self._contended("delete", e):
+                raise
+
+    def _prune(self) -> None:
+        self._conn.execute("DELETE FROM kv WHERE expires < ?", (time.time(),))
+        (count,) = self._conn.execute("SELECT COUNT(*) FROM kv").fetchone()
+        if count > self.max_entries:
+            self._conn.execute(
+                "DELETE FROM kv WHERE key IN (SELECT key FROM kv ORDER BY written LIMIT ?)",
+                (count - self.max_entries,),
+            )
+
+    def stats(self) -> Dict[str, Any]:
+        return {**super().stats(), "contended": self.contended}
+
+
+_store: Optional[CacheStore] = None
+
+
+def build_cache_store(backend: str = CACHE_BACKEND) -> CacheStore:
+    if backend == "sqlite":
+        return SqliteCacheStore()
+    if backend == "none":
+        return NullCacheStore()
+    return MemoryCacheStore()
+
+
+def get_cache_store() -> CacheStore:
+    """Process-wide store selected by CACHE_BACKEND (created on first use)."""
+    global _store
+    if _store is None:
+        _store = build_cache_store()
+    return _store
+
+
+def set_cache_store(store: Optional[CacheStore]) -> None:
+    global _store
+    _store = store
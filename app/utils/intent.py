@@ -1,7 +1,10 @@
 from __future__ import annotations
 import os
+import logging
 from app.utils.intent_keywords import classify_intent_keywords
-from app.utils.intent_llm import classify_intent_llm
+from app.utils.intent_llm import classify_intent_llm, classify_intent_llm_async
+
+logger = logging.getLogger(__name__)
 
 def classify_intent(query: str) -> str:
     """
@@ -11,7 +14,13 @@ def classify_intent(query: str) -> str:
     """
     mode = (os.getenv("INTENT_CLASSIFIER") or "keywords").strip().lower()
     if mode == "llm":
-        print(f"[intent] using llm classifier: {mode}")
+        logger.debug("using llm classifier: %s", mode)
         return classify_intent_llm(query)
-    print(f"[intent] using keywords classifier: {mode}")
+    logger.debug("using keywords classifier: %s", mode)
+    return classify_intent_keywords(query)
+
+async def classify_intent_async(query: str) -> str:
+    """classify_intent for the async graph: the llm path awaits its cache and model off-loop."""
+    if (os.getenv("INTENT_CLASSIFIER") or "keywords").strip().lower() == "llm":
+        return await classify_intent_llm_async(query)
     return classify_intent_keywords(query)
@@ -1,8 +1,16 @@
 from __future__ import annotations
 import os, re, json
+import asyncio
+import logging
 from typing import Optional
 
 from app.utils.intent_keywords import classify_intent_keywords
+from app.utils.cache_store import get_cache_store
+
+logger = logging.getLogger(__name__)
+
+# Successful LLM classifications are cached (shared across workers with CACHE_BACKEND=sqlite).
+INTENT_CACHE_TTL_S = float(os.getenv("INTENT_CACHE_TTL_S", "3600"))
 
 _ALLOWED = {"fetch_email_and_address", "fetch_contact_preference"}
 
@@ -43,7 +51,7 @@ def _classify_with_openai(query: str) -> Optional[str]:
         from langchain_openai import ChatOpenAI
         from langchain_core.messages import SystemMessage, HumanMessage
     except Exception as e:
-        print(f"[intent-llm] openai stack import failed: {e}")
+        logger.warning("openai stack import failed: %s", e)
         return None
 
     model = os.getenv("OPENAI_MODEL", "o4-mini")
@@ -60,18 +68,46 @@ def _classify_with_openai(query: str) -> Optional[str]:
             )
             text = (getattr(resp, "content", None) or "").strip()
             intent = _parse_intent(text)
-            print(f"[intent-llm] openai classify: intent={intent}")
+            logger.debug("openai classify (json retry): intent=%s", intent)
         return intent
     except Exception as e:
-        print(f"[intent-llm] openai classify failed: {e}")
+        logger.warning("openai classify failed: %s", e)
         return None
 
+def _cache_key(query: str) -> str:
+    # Member ids don't affect the intent; fold digits so queries share entries.
+    q = re.sub(r"\d+", "#", " ".join((query or "").lower().split()))
+    return f"intent:llm:{q}"
+
 #
 def classify_intent_llm(query: str) -> str:
     """
     Orchestrates which LLM stack to use based on INTENT_LLM_STACK.
-    Falls back to keywords if anything fails.
+    Falls back to keywords if anything fails (fallbacks are not cached).
     """
+    store = get_cache_store()
+    key = _cache_key(query)
+    intent = store.get(key)
+    if intent:
+        return intent
     intent = _classify_with_openai(query)
-    print(f"[intent-llm] openai classify: intent={intent}")
+    logger.debug("openai classify: intent=%s", intent)
+    if intent:
+        store.set(key, intent, INTENT_CACHE_TTL_S)
+    return intent or classify_intent_keywords(query)
+
+async def classify_intent_llm_async(query: str) -> str:
+    """
+    classify_intent_llm for async callers: the cache store and the (blocking)
+    LLM client never run on the event loop.
+    """
+    store = get_cache_store()
+    key = _cache_key(query)
+    intent = await store.aget(key)
+    if intent:
+        return intent
+    intent = await asyncio.to_thread(_classify_with_openai, query)
+    logger.debug("openai classify: intent=%s", intent)
+    if intent:
+        await store.aset(key, intent, INTENT_CACHE_TTL_S)
     return intent or classify_intent_keywords(query)
@@ -0,0 +1,97 @@
+from __future__ import annotations
+import os
+import json
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, NamedTuple, Optional
+
+RENDER_CACHE_MAX_ENTRIES = int(os.getenv("RENDER_CACHE_MAX_ENTRIES", "1024"))
+
+
+def canonical_json(obj: Any) -> bytes:
+    """Deterministic JSON bytes (sorted keys, no whitespace)."""
+    return json.dumps(
+        obj, sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=str
+    ).encode("utf-8")
+
+
+def content_hash(data: bytes) -> str:
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+class Rendered(NamedTuple):
+    fingerprint: str
+    etag: str
+    out: Dict[str, Any]  # shared across requests: treat as read-only
+    body: bytes          # serialized `out`, as sent on the wire
+
+
+class RenderCache:
+    """
+    In-process LRU of built outputs keyed by (intent, member). An entry is
+    reused only while the fingerprint of the builder inputs is unchanged,
+    so no TTL is needed.
+    """
+
+    def __init__(self, max_entries: int = RENDER_CACHE_MAX_ENTRIES) -> None:
+        self.max_entries = max_entries
+        self._by_key: "OrderedDict[str, Rendered]" = OrderedDict()
+        self._by_etag: Dict[str, Rendered] = {}
+        # etag -> {variant name -> alternate encoding of the same output}
+        self._variants: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        self.builds = 0
+        self.reuses = 0
+
+    def lookup(self, key: str, fingerprint: str) -> Optional[Rendered]:
+        with self._lock:
+            entry = self._by_key.get(key)
+            if entry is None or entry.fingerprint != fingerprint:
+                return None
+            self._by_key.move_to_end(key)
+            self.reuses += 1
+            return entry
+
+    def store(self, key: str, fingerprint: str, out: Dict[str, Any]) -> Rendered:
+        body = json.dumps(
+            out, separators=(",", ":"), ensure_ascii=False, default=str
+        ).encode("utf-8")
+        entry = Rendered(fingerprint, content_hash(body), out, body)
+        with self._lock:
+            self.builds += 1
+            old = self._by_key.pop(key, None)
+            if old is not None:
+                self._by_etag.pop(old.etag, None)
+                self._variants.pop(old.etag, None)
+            self._by_key[key] = entry
+            self._by_etag[entry.etag] = entry
+            while len(self._by_key) > self.max_entries:
+                _, evicted = self._by_key.popitem(last=False)
+                self._by_etag.pop(evicted.etag, None)
+                self._variants.pop(evicted.etag, None)
+        return entry
+
+    def body(self, etag: str) -> Optional[bytes]:
+        entry = self._by_etag.get(etag)
+        return entry.body if entry is not None else None
+
+    def variant(self, etag: str, name: str, make: Callable[[Dict[str, Any]], Any]) -> Any:
+        """Memoize `make(out)` (e.g. another wire format) alongside the cached output."""
+        entry = self._by_etag.get(etag)
+        if entry is None:
+            raise KeyError(etag)
+        variants = self._variants.get(etag)
+        if variants is not None and name in variants:
+            return variants[name]
+        value = make(entry.out)
+        with self._lock:
+            if etag in self._by_etag:
+                self._variants.setdefault(etag, {})[name] = value
+        return value
+
+    def stats(self) -> Dict[str, int]:
+        return {"entries": len(self._by_key), "builds": self.builds, "reuses": self.reuses}
+
+
+render_cache = RenderCache()
@@ -0,0 +1,176 @@
+from __future__ import annotations
+import os
+import re
+import gzip
+import json
+from typing import Any, Dict, List, Optional, Tuple
+
+try:
+    import msgpack  # type: ignore
+except Exception:
+    msgpack = None  # type: ignore
+
+try:
+    import zstandard  # type: ignore
+except Exception:
+    zstandard = None  # type: ignore
+
+# ------------------------------------------------------------------
+# Config
+# ------------------------------------------------------------------
+# Compact responses at least this large are compressed if the client accepts it.
+WIRE_COMPRESS_MIN_BYTES = int(os.getenv("WIRE_COMPRESS_MIN_BYTES", "1024"))
+WIRE_GZIP_LEVEL = int(os.getenv("WIRE_GZIP_LEVEL", "6"))
+WIRE_ZSTD_LEVEL = int(os.getenv("WIRE_ZSTD_LEVEL", "3"))
+
+# Media types (opt-in via Accept; anything else gets the default JSON).
+DEFAULT_JSON = "application/json"
+COMPACT_JSON = "application/vnd.profile.compact+json"
+MSGPACK = "application/msgpack"
+
+_FORMATS = {
+    COMPACT_JSON: "compact",
+    MSGPACK: "msgpack",
+    "application/x-msgpack": "msgpack",
+}
+CONTENT_TYPES = {"json": DEFAULT_JSON, "compact": COMPACT_JSON, "msgpack": MSGPACK}
+
+
+def _parse_q_list(header: Optional[str]) -> List[str]:
+    """Header tokens ordered by q-value (stable), q=0 entries removed."""
+    items: List[Tuple[float, int, str]] = []
+    for i, part in enumerate((header or "").split(",")):
+        token, *params = [p.strip() for p in part.split(";")]
+        if not token:
+            continue
+        q = 1.0
+        for p in params:
+            if p.startswith("q="):
+                try:
+                    q = float(p[2:])
+                except ValueError:
+                    q = 0.0
+        if q > 0:
+            items.append((-q, i, token.lower()))
+    return [token for _, _, token in sorted(items)]
+
+
+def negotiate_format(accept: Optional[str]) -> str:
+    """'compact' / 'msgpack' only when explicitly asked for; otherwise 'json'."""
+    for media_type in _parse_q_list(accept):
+        fmt = _FORMATS.get(media_type)
+        if fmt == "msgpack" and msgpack is None:
+            continue
+        if fmt:
+            return fmt
+        if media_type in (DEFAULT_JSON, "*/*", "application/*"):
+            return "json"
+    return "json"
+
+
+def negotiate_encoding(accept_encoding: Optional[str]) -> Optional[str]:
+    accepted = set(_parse_q_list(accept_encoding))
+    if "zstd" in accepted and zstandard is not None:
+        return "zstd"
+    if "gzip" in accepted:
+        return "gzip"
+    return None
+
+
+def compress(body: bytes, coding: Optional[str]) -> bytes:
+    if coding == "zstd":
+        return zstandard.ZstdCompressor(level=WIRE_ZSTD_LEVEL).compress(body)
+    if coding == "gzip":
+        return gzip.compress(body, compresslevel=WIRE_GZIP_LEVEL, mtime=0)
+    return body
+
+
+# ------------------------------------------------------------------
+# Compact payload
+# ------------------------------------------------------------------
+# Compared to the default output:
+#   * null values are dropped everywhere (except inside columns, to keep rows aligned)
+#   * [{"name": "ZipCd: ", "value": "44012"}, ...] becomes {"zipCd": "44012", ...}
+#   * other lists of objects become columns: {"n": 2, "preferenceUid": ["HRA", "X"], ...};
+#     a column that is null for every row is omitted
+def _label_key(label: str) -> str:
+    words = re.sub(r"[^0-9A-Za-z ]+", " ", label).split()
+    if not words:
+        return label
+    first = words[0][:1].lower() + words[0][1:]
+    return first + "".join(w[:1].upper() + w[1:] for w in words[1:])
+
+
+def _is_name_value_list(items: List[Any]) -> bool:
+    return all(isinstance(it, dict) and set(it) <= {"name", "value"} and "name" in it for it in items)
+
+
+def compact_payload(obj: Any) -> Any:
+    if isinstance(obj, dict):
+        return {
+            k: compact_payload(v) if isinstance(v, (dict, list)) else v
+            for k, v in obj.items()
+            if v is not None
+        }
+    if isinstance(obj, list):
+        if obj and _is_name_value_list(obj):
+            return {
+                _label_key(it["name"]): compact_payload(it["value"])
+                for it in obj
+                if it.get("value") is not None
+            }
+        if obj and all(isinstance(it, dict) for it in obj):
+            n = len(obj)
+            columns: Dict[str, List[Any]] = {}
+            for row, it in enumerate(obj):
+                for k, v in it.items():
+                    if v is None:
+                        continue
+                    col = columns.get(k)
+                    if col is None:
+                        col = columns[k] = [None] * n
+                    col[row] = compact_payload(v) if isinstance(v, (dict, list)) else v
+            out: Dict[str, Any] = {"n": n}
+            out.update(columns)
+            return out
+        return [compact_payload(v) if isinstance(v, (dict, list)) else v for v in obj]
+    return obj
+
+
+def _packb(obj: Any) -> bytes:
+    return msgpack.packb(obj, use_bin_type=True)
+
+
+def render_envelope(tool_name: str, payload_body: bytes, context_id: Optional[str], fmt: str) -> bytes:
+    """
+    A2A message envelope around an already-encoded payload. The payload
+    bytes are spliced in (JSON and msgpack both concatenate) so cached
+    payloads are never re-encoded.
+    """
+    if fmt == "msgpack":
+        head = (
+            bytes([0x80 | (4 if context_id else 3)])  # fixmap
+            + _packb("kind") + _packb("message") + _packb("role") + _packb("assistant")
+            + _packb("parts") + bytes([0x92])  # fixarray(2)
+            + _packb({"kind": "text", "text": tool_name})
+            + bytes([0x82]) + _packb("kind") + _packb("json") + _packb("json")
+        )
+        tail = _packb("contextId") + _packb(context_id) if context_id else b""
+        return head + payload_body + tail
+    head = (
+        b'{"kind":"message","role":"assistant","parts":[{"kind":"text","text":'
+        + json.dumps(tool_name, ensure_ascii=False).encode("utf-8")
+        + b'},{"kind":"json","json":'
+    )
+    tail = b"}]"
+    if context_id:
+        tail += b',"contextId":' + json.dumps(context_id, ensure_ascii=False).encode("utf-8")
+    return head + payload_body + tail + b"}"
+
+
+def encode_compact(payload_compact: Any, fmt: str) -> bytes:
+    if fmt == "msgpack":
+        return msgpack.packb(payload_compact, use_bin_type=True)
+    return json.dumps(
+        payload_compact, separators=(",", ":"), ensure_ascii=False, default=str
+    ).encode("utf-8")
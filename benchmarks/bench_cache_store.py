@@ -0,0 +1,62 @@
+"""
+Cross-worker cache hit ratio: K worker processes serve the same skewed
+member mix with a per-process (memory) store vs a shared (sqlite) store.
+
+    python -m benchmarks.bench_cache_store
+"""
+from __future__ import annotations
+import os
+import io
+import random
+import asyncio
+import tempfile
+import contextlib
+import multiprocessing as mp
+
+WORKERS = int(os.getenv("BENCH_WORKERS", "4"))
+N = int(os.getenv("BENCH_N", "500"))
+MEMBERS = int(os.getenv("BENCH_MEMBERS", "400"))
+
+def _worker(worker_id: int) -> dict:
+    from app.tools import profile_tools, resilience
+    from app.utils.cache_store import get_cache_store
+
+    rng = random.Random(worker_id)
+    # Zipf-like skew: a few members are requested far more often.
+    members = [str(378477398 + int(MEMBERS * rng.random() ** 3)) for _ in range(N)]
+
+    async def run() -> None:
+        with contextlib.redirect_stdout(io.StringIO()):
+            for m in members:
+                await profile_tools.fetch_email_and_address_async(member_id=m)
+
+    asyncio.run(run())
+    stats = get_cache_store().stats()
+    stats["upstream_calls"] = sum(s["calls"] for s in resilience.upstream_stats().values())
+    return stats
+
+def _run(backend: str, path: str) -> dict:
+    os.environ["CACHE_BACKEND"] = backend
+    os.environ["CACHE_SQLITE_PATH"] = path
+    with mp.get_context("spawn").Pool(WORKERS) as pool:
+        results = pool.map(_worker, range(WORKERS))
+    hits = sum(r["hits"] for r in results)
+    misses = sum(r["misses"] for r in results)
+    return {
+        "hit_ratio": hits / (hits + misses),
+        "upstream_calls": sum(r["upstream_calls"] for r in results),
+    }
+
+def main() -> None:
+    os.environ.setdefault("PROFILE_CACHE_TTL_S", "300")
+    os.environ.setdefault("TOKEN_CACHE_TTL_S", "300")
+    with tempfile.TemporaryDirectory() as d:
+        for backend in ("memory", "sqlite"):
+            r = _run(backend, os.path.join(d, "cache.sqlite"))
+            print(
+                f"backend={backend:<6} workers={WORKERS} requests={WORKERS * N}  "
+                f"hit_ratio={r['hit_ratio'] * 100:.1f}%  upstream_calls={r['upstream_calls']}"
+            )
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+"""
+Polling clients: the same member's profile requested repeatedly, with and
+without If-None-Match. Reports builds, 304s and bytes sent.
+
+    python -m benchmarks.bench_etag
+"""
+from __future__ import annotations
+import os
+import io
+import time
+import contextlib
+
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+from fastapi.testclient import TestClient
+
+from app.server.main import app
+from app.utils.render_cache import render_cache
+
+N = int(os.getenv("BENCH_N", "300"))
+QUERIES = [
+    "show my email and mailing address for member 378477398",
+    "show my contact preferences for member 378477398",
+]
+
+def _poll(client: TestClient, query: str, conditional: bool) -> dict:
+    body = {"kind": "message", "role": "user", "parts": [{"kind": "text", "text": query}]}
+    etag = None
+    sent = not_modified = 0
+    builds0 = render_cache.builds
+    t0 = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        for _ in range(N):
+            headers = {"If-None-Match": etag} if (conditional and etag) else {}
+            r = client.post("/a2a/messages", json=body, headers=headers)
+            etag = r.headers.get("etag", etag)
+            sent += len(r.content)
+            not_modified += r.status_code == 304
+    return {
+        "ms_per_req": (time.perf_counter() - t0) * 1000 / N,
+        "bytes": sent,
+        "not_modified": not_modified,
+        "builds": render_cache.builds - builds0,
+    }
+
+def main() -> None:
+    client = TestClient(app)
+    for query in QUERIES:
+        for conditional in (False, True):
+            r = _poll(client, query, conditional)
+            print(
+                f"{query.split(' for ')[0]:<35} if-none-match={'on ' if conditional else 'off'}  "
+                f"builds={r['builds']:<3} 304s={r['not_modified']:<4} "
+                f"bytes={r['bytes']:<7} {r['ms_per_req']:.2f} ms/req"
+            )
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""
+Hedging / circuit-breaker benchmark against the mocked upstreams.
+
+    python -m benchmarks.bench_hedging
+
+Upstream delays are drawn from a seeded Pareto distribution so runs are
+reproducible; the same seed is replayed with hedging off and on.
+"""
+from __future__ import annotations
+import os
+import io
+import time
+import asyncio
+import contextlib
+
+os.environ.setdefault("MOCK_DELAY_MS", "5")
+os.environ.setdefault("MOCK_DELAY_DIST", "pareto")
+os.environ.setdefault("MOCK_DELAY_ALPHA", "1.3")
+
+from app.tools import profile_tools, resilience  # noqa: E402
+
+N = int(os.getenv("BENCH_N", "400"))
+SEED = int(os.getenv("BENCH_SEED", "42"))
+
+def _pct(samples, q):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(q / 100.0 * len(ordered)))]
+
+async def _run(hedge_enabled: bool) -> dict:
+    resilience.reset_policies(hedge_enabled=hedge_enabled, timeout_ms=0)
+    profile_tools.seed_mock(SEED)
+    lat = []
+    with contextlib.redirect_stdout(io.StringIO()):
+        for _ in range(N):
+            t0 = time.perf_counter()
+            await profile_tools.fetch_email_and_address_async(member_id="378477398")
+            lat.append((time.perf_counter() - t0) * 1000)
+    stats = resilience.upstream_stats()
+    calls = sum(s["calls"] for s in stats.values())
+    hedges = sum(s["hedges"] for s in stats.values())
+    return {
+        "p50": _pct(lat, 50), "p95": _pct(lat, 95), "p99": _pct(lat, 99),
+        "extra_load": hedges / calls if calls else 0.0,
+    }
+
+async def _breaker_demo() -> dict:
+    profile_tools.MOCK_ERROR_RATE = 1.0
+    resilience.reset_policies(timeout_ms=0)
+    errors = {}
+    with contextlib.redirect_stdout(io.StringIO()):
+        for _ in range(20):
+            try:
+                await profile_tools.fetch_contact_preference_async(member_id="378477398")
+            except Exception as e:
+                errors[type(e).__name__] = errors.get(type(e).__name__, 0) + 1
+    profile_tools.MOCK_ERROR_RATE = 0.0
+    return errors
+
+async def main() -> None:
+    for hedge in (False, True):
+        r = await _run(hedge)
+        print(
+            f"hedging={'on ' if hedge else 'off'}  "
+            f"p50={r['p50']:.1f} ms  p95={r['p95']:.1f} ms  p99={r['p99']:.1f} ms  "
+            f"extra_load={r['extra_load']*100:.1f}%"
+        )
+    print("breaker (100% upstream errors, 20 requests):", await _breaker_demo())
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,101 @@
+"""
+Per-request logging cost on the calling (event-loop) thread: the old
+print() lines per request vs the queued logging pipeline.
+
+    python -m benchmarks.bench_logging
+
+Two sinks: a line-buffered file (stdout redirected, PYTHONUNBUFFERED-style)
+and a slow sink that stalls each write, like a stdout pipe whose reader
+(container runtime / log shipper) is applying backpressure.
+
+Requests are paced (BENCH_PACE_US of simulated upstream wait between them,
+when the background writer gets to run); only time spent inside the
+logging calls is counted, i.e. how long logging holds up the event loop.
+"""
+from __future__ import annotations
+import os
+import time
+import logging
+import tempfile
+
+N = int(os.getenv("BENCH_N", "3000"))
+PACE_US = float(os.getenv("BENCH_PACE_US", "500"))
+SLOW_WRITE_US = float(os.getenv("BENCH_SLOW_WRITE_US", "50"))
+MEMBER = "378477398"
+
+class SlowSink:
+    def __init__(self, inner) -> None:
+        self.inner = inner
+
+    def write(self, s: str) -> int:
+        time.sleep(SLOW_WRITE_US / 1e6)
+        return self.inner.write(s)
+
+    def flush(self) -> None:
+        self.inner.flush()
+
+def _print_request(out, i: int) -> None:
+    # The lines the hot path used to print for one email+address request.
+    ms = i / 1000
+    print(f"[intent] using keywords classifier: keywords", file=out)
+    print(f"[timing] access_token: {ms:.1f} ms", file=out)
+    print(f"[timing] GET email(member_id={MEMBER}): {ms:.1f} ms", file=out)
+    print(f"[timing] GET address(member_id={MEMBER}): {ms:.1f} ms", file=out)
+    print(
+        "[timing] tool.fetch_email_and_address(async): "
+        f"token={ms:.1f} ms, await_both={ms:.1f} ms, total={ms:.1f} ms",
+        file=out,
+    )
+    print(f"[timing] node_fetch[fetch_email_and_address]: {ms:.1f} ms", file=out)
+    print(f"[timing] node_build[fetch_email_and_address]: {ms:.1f} ms", file=out)
+    print(f"[timing] handle_request[fetch_email_and_address via LangGraph]: total={ms:.1f} ms", file=out)
+
+_TOOLS = logging.getLogger("app.tools.profile_tools")
+_AGENT = logging.getLogger("app.agents.profile_agent")
+_INTENT = logging.getLogger("app.utils.intent")
+
+def _log_request(_out, i: int) -> None:
+    ms = i / 1000
+    _INTENT.debug("using keywords classifier: %s", "keywords")
+    _TOOLS.debug("access_token: %.1f ms", ms)
+    _TOOLS.debug("GET email(member_id=%s): %.1f ms", MEMBER, ms)
+    _TOOLS.debug("GET address(member_id=%s): %.1f ms", MEMBER, ms)
+    _TOOLS.debug(
+        "tool.fetch_email_and_address(async): token=%.1f ms, await_both=%.1f ms, total=%.1f ms",
+        ms, ms, ms,
+    )
+    _AGENT.debug("node_fetch[%s]: %.1f ms", "fetch_email_and_address", ms)
+    _AGENT.debug("node_build[%s]: %.1f ms", "fetch_email_and_address", ms)
+    _AGENT.info("handle_request[%s via LangGraph]: total=%.1f ms", "fetch_email_and_address", ms)
+
+def _time(fn, out) -> float:
+    spent = 0.0
+    for i in range(N):
+        t0 = time.perf_counter()
+        fn(out, i)
+        spent += time.perf_counter() - t0
+        time.sleep(PACE_US / 1e6)
+    return spent / N * 1e6
+
+def main() -> None:
+    from app.telemetry import log_pipeline
+
+    with tempfile.TemporaryDirectory() as d:
+        for sink_name in ("file", "slow"):
+            with open(os.path.join(d, f"{sink_name}.log"), "w", buffering=1) as f:
+                out = f if sink_name == "file" else SlowSink(f)
+                print(f"{sink_name:<4} sink  print(), 8 lines/request:       {_time(_print_request, out):8.2f} us/request")
+
+                for lean in (False, True):
+                    log_pipeline.configure_logging(stream=out, lean_records=lean)
+                    log_pipeline.request_id_var.set("bench")
+                    for level in ("DEBUG", "INFO"):
+                        logging.getLogger().setLevel(level)
+                        cost = _time(_log_request, out)
+                        label = f"pipeline{', lean' if lean else ''}, LOG_LEVEL={level}:"
+                        print(f"{sink_name:<4} sink  {label:<33}{cost:8.2f} us/request")
+                    log_pipeline.shutdown_logging()
+                print(f"{sink_name:<4} sink  pipeline stats: {log_pipeline.logging_stats()}")
+
+if __name__ == "__main__":
+    main()
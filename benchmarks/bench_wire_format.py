@@ -0,0 +1,49 @@
+"""
+Payload size and serialization time: default JSON vs the compact formats,
+for members with growing preference lists.
+
+    python -m benchmarks.bench_wire_format
+"""
+from __future__ import annotations
+import os
+import json
+import time
+
+from app.tools.profile_tools import PREFS
+from app.utils.builders import build_preferences_output
+from app.utils import wire_format
+from app.utils.wire_format import compact_payload, encode_compact, compress
+
+SIZES = [int(n) for n in os.getenv("BENCH_SIZES", "1,10,100,1000").split(",")]
+REPEAT = int(os.getenv("BENCH_REPEAT", "50"))
+
+def _prefs(n: int) -> dict:
+    base = PREFS["memberPreference"][0]
+    return {"memberPreference": [dict(base, preferenceUid=f"PREF{i}") for i in range(n)]}
+
+def _time_us(fn) -> float:
+    t0 = time.perf_counter()
+    for _ in range(REPEAT):
+        fn()
+    return (time.perf_counter() - t0) / REPEAT * 1e6
+
+def main() -> None:
+    formats = ["json", "compact"] + (["msgpack"] if wire_format.msgpack is not None else [])
+    codings = [None, "gzip"] + (["zstd"] if wire_format.zstandard is not None else [])
+    print(f"{'prefs':>5}  {'format':<8} {'bytes':>8} {'gzip':>7} {'zstd':>7}  {'encode us':>10}  {'+gzip us':>9}")
+    for n in SIZES:
+        out = build_preferences_output("378477398", _prefs(n)).model_dump()
+        for fmt in formats:
+            if fmt == "json":
+                enc = lambda: json.dumps(out, separators=(",", ":"), ensure_ascii=False, default=str).encode("utf-8")
+            else:
+                enc = lambda: encode_compact(compact_payload(out), fmt)
+            body = enc()
+            sizes = {c: len(compress(body, c)) for c in codings}
+            print(
+                f"{n:>5}  {fmt:<8} {sizes[None]:>8} {sizes['gzip']:>7} {sizes.get('zstd', '-'):>7}  "
+                f"{_time_us(enc):>10.1f}  {_time_us(lambda: compress(body, 'gzip')):>9.1f}"
+            )
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""
+Replay a recorded trace (TRACE_MODE=record) offline.
+
+Upstream calls are served from the trace with the recorded latency
+distribution, and the recorded A2A requests are sent with their original
+arrival pattern (open loop, optionally sped up).
+
+    python -m benchmarks.replay_trace trace-*.jsonl.gz [--speed 2] [--url http://127.0.0.1:9000]
+
+Without --url the app is driven in-process with TRACE_MODE=replay, so no
+network access is needed. With --url the target server should itself run
+with TRACE_MODE=replay TRACE_FILE=<same trace(s), comma-separated>.
+Idle time before the first recorded request is skipped.
+"""
+from __future__ import annotations
+import os
+import io
+import sys
+import time
+import asyncio
+import argparse
+import contextlib
+
+import httpx
+
+def _pct(samples, q):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(q / 100.0 * len(ordered)))] if ordered else 0.0
+
+async def replay(paths: list[str], url: str | None, speed: float) -> None:
+    from app.telemetry.trace_recorder import load_a2a_requests
+
+    requests = load_a2a_requests(paths)
+    if not requests:
+        sys.exit(f"no recorded A2A requests in {', '.join(paths)}")
+    t_first = requests[0]["t"]
+
+    if url:
+        client = httpx.AsyncClient(base_url=url, timeout=30)
+    else:
+        from app.server.main import app
+        client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://replay")
+
+    latencies, statuses = [], {}
+
+    async def send(rec) -> None:
+        t0 = time.perf_counter()
+        r = await client.post("/a2a/messages", json=rec["b"], headers=rec.get("h") or {})
+        latencies.append((time.perf_counter() - t0) * 1000)
+        statuses[r.status_code] = statuses.get(r.status_code, 0) + 1
+
+    start = time.perf_counter()
+    tasks = []
+    with contextlib.redirect_stdout(io.StringIO()):
+        async with client:
+            for rec in requests:
+                delay = start + (rec["t"] - t_first) / speed - time.perf_counter()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                tasks.append(asyncio.create_task(send(rec)))
+            await asyncio.gather(*tasks)
+    wall = time.perf_counter() - start
+
+    print(f"replayed {len(requests)} requests in {wall:.2f} s (speed x{speed:g}), statuses={statuses}")
+    print(
+        f"latency p50={_pct(latencies, 50):.1f} ms  p95={_pct(latencies, 95):.1f} ms  "
+        f"p99={_pct(latencies, 99):.1f} ms  max={max(latencies):.1f} ms"
+    )
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    ap.add_argument("trace", nargs="+", help="trace file(s), e.g. one per worker")
+    ap.add_argument("--url", default=None, help="drive a running server instead of the in-process app")
+    ap.add_argument("--speed", type=float, default=1.0, help="arrival-time compression factor")
+    ap.add_argument("--seed", default="0", help="seed for latency sampling")
+    args = ap.parse_args()
+    # Must be set before app modules read their config.
+    os.environ["TRACE_MODE"] = "replay"
+    os.environ["TRACE_FILE"] = ",".join(args.trace)
+    os.environ["TRACE_SEED"] = args.seed
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+    asyncio.run(replay(args.trace, args.url, args.speed))
+
+if __name__ == "__main__":
+    main()
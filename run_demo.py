@@ -1,6 +1,8 @@
 from app.agents.profile_agent import handle_request
+from app.telemetry.log_pipeline import configure_logging
 from dotenv import load_dotenv
 load_dotenv()
+configure_logging()
 
 if __name__ == "__main__":
     t1, o1 = handle_request(
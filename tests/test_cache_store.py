@@ -0,0 +1,100 @@
+import asyncio
+import os
+import sqlite3
+import stat
+import threading
+
+import pytest
+
+from app.tools import profile_tools
+from app.utils import cache_store
+from app.utils.cache_store import CacheStore, MemoryCacheStore, SqliteCacheStore
+
+
+def test_cache_store_is_abstract():
+    with pytest.raises(TypeError):
+        CacheStore()
+
+
+def test_memory_store_ttl_and_lru(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(cache_store.time, "time", lambda: now[0])
+    store = MemoryCacheStore(max_entries=2)
+    store.set("a", {"v": 1}, ttl_s=10)
+    store.set("b", 2, ttl_s=10)
+    assert store.get("a") == {"v": 1}
+    store.set("c", 3, ttl_s=10)  # evicts "b", the least recently used
+    assert store.get("b") is None
+    now[0] += 11
+    assert store.get("a") is None
+    store.set("d", 4, ttl_s=0)  # ttl 0 disables caching
+    assert store.get("d") is None
+
+
+def test_sqlite_store_round_trip_and_private_file(tmp_path):
+    path = str(tmp_path / "cache.sqlite")
+    store = SqliteCacheStore(path)
+    asyncio.run(store.aset("k", {"x": [1, "y"]}, 60))
+    assert asyncio.run(store.aget("k")) == {"x": [1, "y"]}
+    for name in os.listdir(tmp_path):
+        assert stat.S_IMODE(os.stat(tmp_path / name).st_mode) == 0o600, name
+
+
+def test_sqlite_store_shared_between_instances(tmp_path):
+    path = str(tmp_path / "cache.sqlite")
+    SqliteCacheStore(path).set("k", "v", 60)
+    assert SqliteCacheStore(path).get("k") == "v"
+
+
+def test_sqlite_lock_contention_is_a_miss(tmp_path):
+    path = str(tmp_path / "cache.sqlite")
+    store = SqliteCacheStore(path, busy_ms=10)
+    other = sqlite3.connect(path, isolation_level=None)
+    other.execute("BEGIN EXCLUSIVE")
+    try:
+        store.set("k", "v", 60)
+        assert store.get("k") is None
+    finally:
+        other.execute("ROLLBACK")
+    assert store.stats()["contended"] >= 1
+
+
+def test_access_token_never_reaches_shared_store(monkeypatch):
+    shared = MemoryCacheStore()
+    monkeypatch.setattr(cache_store, "_store", shared)
+    monkeypatch.setattr(profile_tools, "_token_cache", MemoryCacheStore(max_entries=1))
+    asyncio.run(profile_tools.fetch_email_and_address_async(member_id="500000001"))
+    assert not any(k.startswith("token") for k in shared._data)
+    assert profile_tools._token_cache.get("token:access") == "tbd"
+
+
+def test_llm_intent_cache_stays_off_the_event_loop(tmp_path, monkeypatch):
+    from app.agents import profile_agent
+    from app.utils import intent_llm
+
+    store = SqliteCacheStore(str(tmp_path / "cache.sqlite"))
+    monkeypatch.setattr(cache_store, "_store", store)
+    monkeypatch.setenv("INTENT_CLASSIFIER", "llm")
+    monkeypatch.setattr(intent_llm, "_classify_with_openai", lambda q: "fetch_email_and_address")
+    loop_threads, sqlite_threads = set(), []
+    for name in ("_get", "_set"):
+        real = getattr(SqliteCacheStore, name)
+
+        def spy(self, *args, _real=real):
+            sqlite_threads.append(threading.get_ident())
+            return _real(self, *args)
+
+        monkeypatch.setattr(SqliteCacheStore, name, spy)
+
+    async def run():
+        loop_threads.add(threading.get_ident())
+        for _ in range(2):  # miss + store, then hit
+            intent, _ = await profile_agent.handle_request_async(
+                query="what is my address?", member_id="500000002"
+            )
+            assert intent == "fetch_email_and_address"
+
+    asyncio.run(run())
+    assert len(sqlite_threads) == 3
+    assert not loop_threads & set(sqlite_threads)
+    assert store.hits == 1
@@ -0,0 +1,92 @@
+import pytest
+from fastapi.testclient import TestClient
+
+from app.server.main import app, _etag_matches
+from app.tools import profile_tools
+from app.utils.render_cache import render_cache
+
+
+@pytest.fixture
+def client():
+    return TestClient(app)
+
+
+def _post(client, text, **headers):
+    return client.post(
+        "/a2a/messages",
+        json={"role": "user", "parts": [{"kind": "text", "text": text}]},
+        headers=headers,
+    )
+
+
+def test_repeat_requests_do_not_rebuild(client):
+    first = _post(client, "show email for member 200000001")
+    assert first.status_code == 200
+    builds = render_cache.builds
+    for _ in range(5):
+        again = _post(client, "show email for member 200000001")
+        assert again.headers["etag"] == first.headers["etag"]
+        assert again.content == first.content
+    assert render_cache.builds == builds
+
+
+def test_if_none_match_returns_empty_304(client):
+    etag = _post(client, "show preferences for member 200000002").headers["etag"]
+    r = _post(client, "show preferences for member 200000002", **{"If-None-Match": etag})
+    assert r.status_code == 304
+    assert r.content == b""
+    assert r.headers["etag"] == etag
+
+
+def test_changed_upstream_data_gets_new_etag(client, monkeypatch):
+    etag = _post(client, "show email for member 200000003").headers["etag"]
+    email = {"email": [{**profile_tools.EMAIL["email"][0], "emailAddress": "NEW@SAMPLEDOMAIN.COM"}]}
+    monkeypatch.setattr(profile_tools, "EMAIL", email)
+    builds = render_cache.builds
+    r = _post(client, "show email for member 200000003", **{"If-None-Match": etag})
+    assert r.status_code == 200
+    assert r.headers["etag"] != etag
+    assert b"NEW@SAMPLEDOMAIN.COM" in r.content
+    assert render_cache.builds == builds + 1
+
+
+@pytest.mark.parametrize(
+    "header, expected",
+    [
+        ('"abc"', True),
+        ('W/"abc"', True),
+        ("*", True),
+        ('"x", W/"abc" , "y"', True),
+        ('"x", "y"', False),
+        ('"abcd"', False),
+        ("", False),
+        (None, False),
+    ],
+)
+def test_etag_matches(header, expected):
+    assert _etag_matches(header, "abc") is expected
+
+
+def test_etag_matches_needs_an_etag():
+    assert _etag_matches("*", "") is False
+
+
+def test_etag_differs_per_conversation(client):
+    def post(context_id, **headers):
+        return client.post(
+            "/a2a/messages",
+            json={
+                "role": "user",
+                "parts": [{"kind": "text", "text": "show email for member 200000004"}],
+                "contextId": context_id,
+            },
+            headers=headers,
+        )
+
+    a, b = post("conv-a"), post("conv-b")
+    assert a.content != b.content
+    assert a.headers["etag"] != b.headers["etag"]
+    crossed = post("conv-b", **{"If-None-Match": a.headers["etag"]})
+    assert crossed.status_code == 200
+    assert crossed.content == b.content
+    assert post("conv-a", **{"If-None-Match": a.headers["etag"]}).status_code == 304
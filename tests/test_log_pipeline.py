@@ -0,0 +1,116 @@
+import io
+import json
+import logging
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+from app.telemetry import log_pipeline
+from app.telemetry.log_pipeline import RateLimitFilter
+
+
+def _record(msg="m", args=()):
+    return logging.LogRecord("t", logging.INFO, __file__, 1, msg, args, None)
+
+
+def test_rate_limit_filter_drops_repeats_per_window(monkeypatch):
+    now = [0.0]
+    monkeypatch.setattr(log_pipeline.time, "monotonic", lambda: now[0])
+    f = RateLimitFilter(limit=2, window_s=1)
+    assert [f.filter(_record()) for _ in range(3)] == [True, True, False]
+    assert f.filter(_record(msg="other template"))
+    now[0] = 1.5
+    assert f.filter(_record())
+    assert f.suppressed == 1
+
+
+def test_rate_limit_ignores_args():
+    f = RateLimitFilter(limit=3, window_s=60)
+    flood = [_record("openai classify failed: %s", (ValueError(i),)) for i in range(100)]
+    flood += [_record("took %.1f ms", (i * 0.37,)) for i in range(100)]
+    assert sum(f.filter(r) for r in flood) == 6
+    assert f.suppressed == 194
+
+
+@pytest.fixture
+def pipeline():
+    stream = io.StringIO()
+    root = logging.getLogger()
+    level = root.level
+
+    def start(**kwargs):
+        kwargs.setdefault("stream", stream)
+        log_pipeline.configure_logging(**kwargs)
+        return kwargs["stream"]
+
+    yield start
+    log_pipeline.shutdown_logging()
+    root.setLevel(level)
+
+
+def test_records_carry_context_ids(pipeline):
+    stream = pipeline()
+    tokens = log_pipeline.bind_log_context(request_id="req-1", member_id="m-1")
+    try:
+        logging.getLogger("app.test").warning("hello %s", "world", extra={"n": 3})
+    finally:
+        log_pipeline.reset_log_context(tokens)
+    log_pipeline.shutdown_logging()
+    doc = json.loads(stream.getvalue().splitlines()[-1])
+    assert doc["msg"] == "hello world"
+    assert (doc["request_id"], doc["member_id"], doc["n"]) == ("req-1", "m-1", 3)
+
+
+def test_stdlib_record_flags_untouched_by_default(pipeline):
+    pipeline()
+    assert logging._srcfile is not None
+    assert logging.logThreads
+
+
+def test_lean_records_are_opt_in_and_restored(pipeline):
+    pipeline(lean_records=True)
+    assert logging._srcfile is None
+    assert not logging.logThreads
+    log_pipeline.shutdown_logging()
+    assert logging._srcfile is not None
+    assert logging.logThreads
+
+
+def test_importing_the_server_starts_no_threads():
+    code = (
+        "import threading, app.server.main as m;"
+        "assert threading.active_count() == 1, threading.enumerate();"
+        "assert not m.logging_stats()['configured']"
+    )
+    subprocess.run([sys.executable, "-c", code], check=True, cwd=Path(__file__).parents[1])
+
+
+def test_full_queue_drops_and_counts(pipeline, monkeypatch):
+    class BlockingStream(io.StringIO):
+        def __init__(self):
+            super().__init__()
+            self.release = threading.Event()
+
+        def write(self, s):
+            self.release.wait(5)
+            return super().write(s)
+
+    stream = BlockingStream()
+    monkeypatch.setattr(log_pipeline, "LOG_QUEUE_SIZE", 2)
+    pipeline(stream=stream)
+    log = logging.getLogger("app.test.queue")
+    log.warning("first")
+    deadline = time.monotonic() + 5
+    while log_pipeline.logging_stats()["queued"] and time.monotonic() < deadline:
+        time.sleep(0.001)  # writer took "first" and is stuck writing it
+    for i in range(5):
+        log.warning("msg %d", i)
+    stats = log_pipeline.logging_stats()
+    assert (stats["queued"], stats["dropped"]) == (2, 3)
+    stream.release.set()
+    log_pipeline.shutdown_logging()
+    assert stream.getvalue().count("\n") == 3
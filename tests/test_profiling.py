@@ -0,0 +1,107 @@
+import asyncio
+import importlib
+import json
+import os
+import threading
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.telemetry import profiling
+from app.telemetry.profiling import LoopLagMonitor, _blocking_site
+
+
+def _frame(path, line=1, func="f"):
+    return f'  File "{path}", line {line}, in {func}\n    code\n'
+
+
+def test_blocking_site_prefers_app_frames():
+    ours = os.path.join(profiling._APP_DIR, "agents", "x.py")
+    stack = [_frame("/srv/main.py"), _frame(ours, 7, "g"), _frame("/app/.venv/lib/site.py")]
+    assert _blocking_site(stack) == f'File "{ours}", line 7, in g'
+
+
+def test_blocking_site_ignores_other_app_directories():
+    stack = [_frame("/app/.venv/lib/app/a.py"), _frame("/app/.venv/lib/b.py")]
+    assert _blocking_site(stack) == 'File "/app/.venv/lib/b.py", line 1, in f'
+
+
+def test_loop_monitor_attributes_a_stall():
+    monitor = LoopLagMonitor(threshold_ms=50, interval_ms=5)
+
+    async def run():
+        monitor.start()
+        await asyncio.sleep(0.02)
+        time.sleep(0.2)  # block the loop
+        await asyncio.sleep(0.05)
+        monitor.stop()
+
+    asyncio.run(run())
+    stats = monitor.stats()
+    assert stats["stalls"] == 1
+    assert stats["max_lag_ms"] >= 100
+    assert stats["top_blockers"][0]["site"].endswith("in run")
+
+
+@pytest.fixture
+def server(monkeypatch):
+    import app.server.main as main
+
+    def load(token):
+        if token is None:
+            monkeypatch.delenv("ADMIN_TOKEN", raising=False)
+        else:
+            monkeypatch.setenv("ADMIN_TOKEN", token)
+        return TestClient(importlib.reload(main).app)
+
+    yield load
+    monkeypatch.delenv("ADMIN_TOKEN", raising=False)
+    importlib.reload(main)
+
+
+def test_admin_hotspots_is_off_by_default(server):
+    assert server(None).get("/admin/hotspots").status_code == 404
+
+
+def test_admin_hotspots_requires_token(server):
+    client = server("s3cret")
+    assert client.get("/admin/hotspots").status_code == 401
+    assert client.get("/admin/hotspots", headers={"Authorization": "Bearer nope"}).status_code == 401
+    r = client.get("/admin/hotspots", headers={"Authorization": "Bearer s3cret"})
+    assert r.status_code == 200
+    assert {"nodes", "loop", "upstreams"} <= set(r.json())
+
+
+def test_x_profile_returns_server_timing(server):
+    r = server(None).post(
+        "/a2a/messages",
+        json={"role": "user", "parts": [{"kind": "text", "text": "show email for member 600000001"}]},
+        headers={"X-Profile": "1"},
+    )
+    timing = r.headers["server-timing"]
+    assert [part.split(";")[0] for part in timing.split(", ")] == ["classify", "fetch", "build"]
+
+
+def test_sampled_profile_dump_runs_off_the_loop(tmp_path, monkeypatch):
+    monkeypatch.setattr(profiling, "PROFILE_SAMPLE_RATE", 1.0)
+    monkeypatch.setattr(profiling, "PROFILE_DUMP_DIR", str(tmp_path))
+    writer_threads = []
+    real = profiling._write_dump
+
+    def spy(*args):
+        writer_threads.append(threading.get_ident())
+        real(*args)
+
+    monkeypatch.setattr(profiling, "_write_dump", spy)
+
+    async def run():
+        token = profiling.start_request_profile()
+        await profiling.profiled_node("node", asyncio.sleep)(0)
+        profiling.finish_request_profile(token)
+        return threading.get_ident()
+
+    loop_thread = asyncio.run(run())  # waits for the default executor on exit
+    assert writer_threads and loop_thread not in writer_threads
+    (dump,) = tmp_path.iterdir()
+    assert json.loads(dump.read_text())["nodes"][0]["node"] == "node"
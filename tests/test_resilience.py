@@ -0,0 +1,149 @@
+import asyncio
+
+import pytest
+
+from app.tools.resilience import (
+    CircuitBreaker,
+    CircuitOpenError,
+    HedgeBudget,
+    LatencyWindow,
+    UpstreamPolicy,
+)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_breaker_opens_after_threshold_and_fails_fast():
+    clock = FakeClock()
+    cb = CircuitBreaker(failure_threshold=3, reset_timeout_ms=1000, clock=clock)
+    for _ in range(2):
+        assert cb.allow()
+        cb.record_failure()
+    assert cb.state == "closed"
+    assert cb.allow()
+    cb.record_failure()
+    assert cb.state == "open"
+    assert not cb.allow()
+
+
+def test_breaker_half_open_allows_one_trial():
+    clock = FakeClock()
+    cb = CircuitBreaker(failure_threshold=1, reset_timeout_ms=1000, clock=clock)
+    cb.record_failure()
+    clock.now = 1.0
+    assert cb.allow()
+    assert cb.state == "half_open"
+    assert not cb.allow()  # trial already in flight
+    cb.record_success()
+    assert cb.state == "closed"
+    assert cb.allow()
+
+
+def test_breaker_failed_trial_reopens():
+    clock = FakeClock()
+    cb = CircuitBreaker(failure_threshold=1, reset_timeout_ms=1000, clock=clock)
+    cb.record_failure()
+    clock.now = 1.0
+    assert cb.allow()
+    cb.record_failure()
+    assert cb.state == "open"
+    clock.now = 1.5
+    assert not cb.allow()
+
+
+def test_breaker_release_frees_trial_slot():
+    clock = FakeClock()
+    cb = CircuitBreaker(failure_threshold=1, reset_timeout_ms=1000, clock=clock)
+    cb.record_failure()
+    clock.now = 1.0
+    assert cb.allow()
+    cb.release()
+    assert cb.state == "half_open"
+    assert cb.allow()
+
+
+def test_budget_starts_empty_and_caps_ratio():
+    budget = HedgeBudget(ratio=0.1, burst=10)
+    assert not budget.try_spend()
+    spent = 0
+    for _ in range(100):
+        budget.earn()
+        spent += budget.try_spend()
+    assert 9 <= spent <= 10  # one token per 1/ratio calls, modulo float rounding
+
+
+def test_budget_burst_bounds_saved_tokens():
+    budget = HedgeBudget(ratio=1.0, burst=2)
+    for _ in range(10):
+        budget.earn()
+    assert [budget.try_spend() for _ in range(3)] == [True, True, False]
+
+
+def test_latency_window_needs_min_samples():
+    w = LatencyWindow(size=10, min_samples=3)
+    w.observe(1)
+    w.observe(2)
+    assert w.percentile(50) is None
+    w.observe(3)
+    assert w.percentile(50) == 2
+    assert w.percentile(100) == 3
+
+
+def _policy(**kwargs):
+    kwargs.setdefault("breaker", CircuitBreaker(failure_threshold=2, reset_timeout_ms=60_000))
+    return UpstreamPolicy("test", **kwargs)
+
+
+def test_policy_breaker_rejects_after_failures():
+    policy = _policy(hedge_enabled=False)
+
+    async def fail():
+        raise ValueError("boom")
+
+    async def run():
+        for _ in range(2):
+            with pytest.raises(ValueError):
+                await policy.call(fail)
+        with pytest.raises(CircuitOpenError):
+            await policy.call(fail)
+
+    asyncio.run(run())
+    assert (policy.failures, policy.rejected) == (2, 1)
+
+
+def test_hedge_wins_and_loser_latency_is_recorded():
+    latency = LatencyWindow(size=100, min_samples=1)
+    latency.observe(10.0)
+    budget = HedgeBudget(ratio=1.0, burst=1)
+    policy = _policy(hedge_enabled=True, hedge_min_delay_ms=0, budget=budget, latency=latency)
+    delays = iter([0.5, 0.0])
+
+    async def factory():
+        await asyncio.sleep(next(delays))
+        return "ok"
+
+    async def run():
+        result = await policy.call(factory)
+        await asyncio.sleep(0)  # let the cancelled primary record itself
+        return result
+
+    assert asyncio.run(run()) == "ok"
+    assert (policy.hedges, policy.hedge_wins) == (1, 1)
+    samples = sorted(latency._samples)
+    assert len(samples) == 3  # seed + hedge winner + cancelled primary
+    assert samples[-1] >= 10.0
+
+
+def test_breaker_retry_after_counts_down():
+    clock = FakeClock()
+    cb = CircuitBreaker(failure_threshold=1, reset_timeout_ms=1000, clock=clock)
+    assert cb.retry_after_s() == 0.0
+    cb.record_failure()
+    clock.now = 0.25
+    assert cb.retry_after_s() == pytest.approx(0.75)
@@ -0,0 +1,135 @@
+import asyncio
+import os
+import stat
+
+import pytest
+
+from app.agents import profile_agent, session_store
+from app.agents.session_store import BoundedMemorySaver
+from app.tools import profile_tools
+
+
+@pytest.fixture
+def email_calls(monkeypatch):
+    calls = []
+    real = profile_tools._get_email_async
+
+    async def counting(member_id, bearer):
+        calls.append(member_id)
+        return await real(member_id, bearer)
+
+    monkeypatch.setattr(profile_tools, "_get_email_async", counting)
+    return calls
+
+
+def _turn(query, member_id=None, context_id=None):
+    return asyncio.run(
+        profile_agent.handle_request_async(query=query, member_id=member_id, context_id=context_id)
+    )
+
+
+def test_follow_up_turn_reuses_fetched_data(email_calls):
+    intent, first = _turn("show email", "300000001", "conv-reuse")
+    assert intent == "fetch_email_and_address"
+    _, again = _turn("and the email again?", None, "conv-reuse")
+    assert again == first
+    assert email_calls == ["300000001"]
+
+
+def test_stale_session_data_is_refetched(email_calls, monkeypatch):
+    _turn("show email", "300000002", "conv-stale")
+    monkeypatch.setattr(session_store, "SESSION_MAX_AGE_S", -1)
+    _turn("show email", None, "conv-stale")
+    assert email_calls == ["300000002", "300000002"]
+
+
+def test_other_member_in_conversation_is_refetched(email_calls):
+    _turn("show email", "300000003", "conv-switch")
+    _, out = _turn("show email", "300000004", "conv-switch")
+    assert email_calls == ["300000003", "300000004"]
+    assert "300000004" in str(out)
+
+
+def test_without_context_every_turn_fetches(email_calls):
+    _turn("show email", "300000005")
+    _turn("show email", "300000005")
+    assert email_calls == ["300000005", "300000005"]
+
+
+def test_saver_keeps_only_latest_checkpoint():
+    saver = BoundedMemorySaver(max_threads=10)
+    graph = profile_agent._graph.compile(checkpointer=saver)
+    config = {"configurable": {"thread_id": "conv-bounded"}}
+
+    async def run():
+        for i in range(10):
+            query = "show email" if i % 2 else "show preferences"
+            await graph.ainvoke({"query": query, "member_id": "300000006"}, config)
+        return await graph.aget_state(config)
+
+    state = asyncio.run(run())
+    assert set(state.values["fetched_at"]) == {"fetch_email_and_address", "fetch_contact_preference"}
+    assert sum(len(ns) for ns in saver.storage["conv-bounded"].values()) == 1
+    assert not saver.writes
+    assert saver.pruned > 0
+
+
+def test_saver_evicts_lru_and_idle_threads():
+    now = [0.0]
+    saver = BoundedMemorySaver(max_threads=2, idle_ttl_s=100, clock=lambda: now[0])
+    graph = profile_agent._graph.compile(checkpointer=saver)
+
+    async def turn(thread_id):
+        await graph.ainvoke(
+            {"query": "show email", "member_id": "300000007"},
+            {"configurable": {"thread_id": thread_id}},
+        )
+
+    asyncio.run(turn("a"))
+    asyncio.run(turn("b"))
+    asyncio.run(turn("c"))
+    assert saver.thread_count == 2
+    assert "a" not in saver.storage
+
+    now[0] = 1000.0
+    asyncio.run(turn("d"))
+    assert saver.thread_count == 1
+    assert set(saver.storage) == {"d"}
+
+
+def test_sqlite_saver_is_private_and_bounded(tmp_path, monkeypatch):
+    pytest.importorskip("langgraph.checkpoint.sqlite.aio")
+    path = str(tmp_path / "sessions.sqlite")
+    monkeypatch.setattr(session_store, "SESSION_SQLITE_PATH", path)
+    monkeypatch.setattr(session_store, "_sqlite_saver", None)
+    monkeypatch.setattr(session_store, "_sqlite_loop", None)
+
+    async def run():
+        saver = await session_store._open_sqlite_saver()
+        graph = profile_agent._graph.compile(checkpointer=saver)
+        for thread_id in ("old", "live"):
+            for i in range(5):
+                query = "show email" if i % 2 else "show preferences"
+                await graph.ainvoke(
+                    {"query": query, "member_id": "300000008"},
+                    {"configurable": {"thread_id": thread_id}},
+                )
+        counts = {}
+        for table in ("checkpoints", "writes"):
+            async with saver.conn.execute(f"SELECT thread_id, COUNT(*) FROM {table} GROUP BY thread_id") as cur:
+                counts[table] = dict(await cur.fetchall())
+        saver.max_threads = 1
+        await saver.sweep()
+        async with saver.conn.execute("SELECT DISTINCT thread_id FROM checkpoints") as cur:
+            remaining = [row[0] for row in await cur.fetchall()]
+        state = await graph.aget_state({"configurable": {"thread_id": "live"}})
+        await saver.conn.close()
+        return counts, remaining, state
+
+    counts, remaining, state = asyncio.run(run())
+    assert counts["checkpoints"] == {"old": 1, "live": 1}
+    assert counts["writes"] == {}
+    assert remaining == ["live"]
+    assert set(state.values["fetched_at"]) == {"fetch_email_and_address", "fetch_contact_preference"}
+    for name in os.listdir(tmp_path):
+        assert stat.S_IMODE(os.stat(tmp_path / name).st_mode) == 0o600, name
@@ -0,0 +1,103 @@
+import asyncio
+import gzip
+import json
+import os
+import stat
+import time
+
+import pytest
+
+from app.telemetry import trace_recorder
+from app.telemetry.trace_recorder import (
+    REDACTED,
+    TracePlayer,
+    TraceWriter,
+    load_a2a_requests,
+    read_trace,
+    redact,
+)
+
+
+def _write(path, records):
+    with gzip.open(path, "wt", encoding="utf-8") as f:
+        for rec in records:
+            f.write(json.dumps(rec) + "\n")
+
+
+def test_redact():
+    payload = {"access_token": "secret", "expires_in": 60, "nested": [{"password": "p", "ok": 1}]}
+    assert redact(payload) == {
+        "access_token": REDACTED,
+        "expires_in": 60,
+        "nested": [{"password": REDACTED, "ok": 1}],
+    }
+
+
+def test_writer_records_session_and_redacts(tmp_path):
+    path = str(tmp_path / "t.jsonl.gz")
+    writer = TraceWriter(path)
+    writer.upstream("access_token", None, 1.5, {"access_token": "secret"})
+    writer.a2a({"x-conversation-id": "c"}, {"role": "user"})
+    writer.close()
+    assert stat.S_IMODE(os.stat(path).st_mode) == 0o600
+    records = list(read_trace(path))
+    assert records[0]["k"] == "session"
+    assert [r["k"] for r in records[1:]] == ["blob", "up", "a2a"]
+    assert "secret" not in json.dumps(records)
+
+
+def test_writer_never_appends(tmp_path):
+    path = str(tmp_path / "t.jsonl.gz")
+    TraceWriter(path).close()
+    with pytest.raises(FileExistsError):
+        TraceWriter(path)
+
+
+def test_flushed_records_survive_a_killed_writer(tmp_path):
+    path = str(tmp_path / "t.jsonl.gz")
+    writer = TraceWriter(path, flush_s=0.01)
+    for i in range(5):
+        writer.a2a({}, {"i": i})
+    deadline = 50
+    while deadline and len(list(read_trace(path))) < 6:
+        time.sleep(0.02)
+        deadline -= 1
+    # No close(): the gzip stream has no trailer, as after os._exit.
+    assert [r["b"]["i"] for r in read_trace(path) if r["k"] == "a2a"] == list(range(5))
+    writer._q.put(writer._STOP)
+
+
+def test_read_trace_stops_at_truncated_tail(tmp_path):
+    path = str(tmp_path / "t.jsonl.gz")
+    _write(path, [{"k": "session", "wall": 0}, {"k": "a2a", "t": 1, "b": 1}])
+    data = open(path, "rb").read()
+    with open(path, "wb") as f:
+        f.write(data[:-12])
+    assert [r["k"] for r in read_trace(path)][:1] == ["session"]
+
+
+def test_load_a2a_requests_merges_sessions(tmp_path):
+    a, b = str(tmp_path / "a.jsonl.gz"), str(tmp_path / "b.jsonl.gz")
+    _write(a, [{"k": "session", "wall": 100.0}, {"k": "a2a", "t": 5.0, "b": "a1"}])
+    _write(b, [{"k": "session", "wall": 102.0}, {"k": "a2a", "t": 1.0, "b": "b1"}])
+    reqs = load_a2a_requests([a, b])
+    assert [(r["b"], r["t"]) for r in reqs] == [("b1", 3.0), ("a1", 5.0)]
+    assert load_a2a_requests(f"{a},{b}") == reqs
+
+
+def test_player_serves_recorded_payload(tmp_path):
+    path = str(tmp_path / "t.jsonl.gz")
+    _write(path, [
+        {"k": "session", "wall": 0},
+        {"k": "blob", "h": "h1", "p": {"email": "x"}},
+        {"k": "up", "t": 0, "ep": "email", "m": "1", "ms": 0.0, "h": "h1"},
+    ])
+    player = TracePlayer(path)
+    assert asyncio.run(player.play("email", "1")) == {"email": "x"}
+    assert asyncio.run(player.play("email", "2")) == {"email": "x"}
+
+
+def test_record_path_creates_private_directory(tmp_path):
+    path = trace_recorder._record_path(str(tmp_path / "traces" / "t-{pid}.jsonl.gz"))
+    assert path.endswith(f"t-{os.getpid()}.jsonl.gz")
+    assert stat.S_IMODE(os.stat(tmp_path / "traces").st_mode) == 0o700
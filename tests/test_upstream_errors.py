@@ -0,0 +1,42 @@
+import pytest
+from fastapi.testclient import TestClient
+
+from app.server.main import app
+from app.tools import profile_tools, resilience
+from app.tools.resilience import CircuitBreaker
+
+
+@pytest.fixture
+def client():
+    yield TestClient(app)
+    resilience.reset_policies()
+
+
+def _post(client, member_id):
+    return client.post(
+        "/a2a/messages",
+        json={"role": "user", "parts": [{"kind": "text", "text": f"show email for member {member_id}"}]},
+    )
+
+
+def test_upstream_failure_is_502_then_breaker_503(client, monkeypatch):
+    monkeypatch.setattr(profile_tools, "MOCK_ERROR_RATE", 1.0)
+    resilience.reset_policies(breaker=CircuitBreaker(failure_threshold=2, reset_timeout_ms=30_000))
+    first = _post(client, "700000001")
+    assert first.status_code == 502
+    assert first.json()["error"] == "upstream_failed"
+    for _ in range(3):  # email + address (+ token) each count against the breaker
+        r = _post(client, "700000001")
+        if r.status_code != 502:
+            break
+    assert r.status_code == 503
+    assert r.json()["error"] == "circuit_open"
+    assert 1 <= int(r.headers["retry-after"]) <= 30
+
+
+def test_upstream_timeout_is_504(client, monkeypatch):
+    monkeypatch.setattr(profile_tools, "MOCK_DELAY_MS", 200)
+    resilience.reset_policies(timeout_ms=10)
+    r = _post(client, "700000002")
+    assert r.status_code == 504
+    assert r.json()["error"] == "upstream_timeout"
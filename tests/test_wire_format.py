@@ -0,0 +1,131 @@
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.server.main import app
+from app.utils import wire_format
+from app.utils.wire_format import (
+    COMPACT_JSON,
+    MSGPACK,
+    compact_payload,
+    encode_compact,
+    negotiate_encoding,
+    negotiate_format,
+    render_envelope,
+)
+
+
+@pytest.mark.parametrize(
+    "accept, expected",
+    [
+        (None, "json"),
+        ("", "json"),
+        ("*/*", "json"),
+        ("application/json", "json"),
+        (COMPACT_JSON, "compact"),
+        (f"application/json;q=0.5, {COMPACT_JSON}", "compact"),
+        (f"{COMPACT_JSON};q=0.2, application/json", "json"),
+        (f"{COMPACT_JSON};q=0", "json"),
+        ("text/html, application/x-msgpack", "msgpack"),
+    ],
+)
+def test_negotiate_format(accept, expected):
+    if expected == "msgpack":
+        pytest.importorskip("msgpack")
+    assert negotiate_format(accept) == expected
+
+
+def test_negotiate_format_without_msgpack(monkeypatch):
+    monkeypatch.setattr(wire_format, "msgpack", None)
+    assert negotiate_format(f"{MSGPACK}, {COMPACT_JSON};q=0.5") == "compact"
+
+
+def test_negotiate_encoding(monkeypatch):
+    assert negotiate_encoding(None) is None
+    assert negotiate_encoding("br, gzip;q=0.5") == "gzip"
+    assert negotiate_encoding("gzip;q=0") is None
+    monkeypatch.setattr(wire_format, "zstandard", None)
+    assert negotiate_encoding("zstd, gzip") == "gzip"
+
+
+def test_compact_payload():
+    out = {
+        "memberId": "1",
+        "note": None,
+        "fields": [{"name": "ZipCd: ", "value": "44012"}, {"name": "City", "value": None}],
+        "prefs": [
+            {"uid": "HRA", "effectiveDt": None, "type": {"code": "HRA", "desc": None}},
+            {"uid": "X", "effectiveDt": None, "extra": 1},
+        ],
+        "tags": ["a", None],
+    }
+    assert compact_payload(out) == {
+        "memberId": "1",
+        "fields": {"zipCd": "44012"},
+        "prefs": {"n": 2, "uid": ["HRA", "X"], "type": [{"code": "HRA"}, None], "extra": [None, 1]},
+        "tags": ["a", None],
+    }
+
+
+@pytest.mark.parametrize("context_id", [None, "conv-1"])
+def test_json_envelope(context_id):
+    payload = {"a": [1, 2], "b": "ü"}
+    body = render_envelope("tool", encode_compact(payload, "compact"), context_id, "compact")
+    msg = json.loads(body)
+    assert msg["parts"] == [{"kind": "text", "text": "tool"}, {"kind": "json", "json": payload}]
+    assert msg.get("contextId") == context_id
+
+
+@pytest.mark.parametrize("context_id", [None, "conv-1"])
+def test_msgpack_envelope_round_trip(context_id):
+    msgpack = pytest.importorskip("msgpack")
+    payload = {"a": [1, 2], "b": "ü", "n": None}
+    body = render_envelope("tool", encode_compact(payload, "msgpack"), context_id, "msgpack")
+    expected = {
+        "kind": "message",
+        "role": "assistant",
+        "parts": [{"kind": "text", "text": "tool"}, {"kind": "json", "json": payload}],
+    }
+    if context_id:
+        expected["contextId"] = context_id
+    assert msgpack.unpackb(body, raw=False) == expected
+
+
+def _post(client, text, **headers):
+    return client.post(
+        "/a2a/messages",
+        json={"role": "user", "parts": [{"kind": "text", "text": text}]},
+        headers=headers,
+    )
+
+
+def test_server_representations(monkeypatch):
+    monkeypatch.setattr("app.server.main.WIRE_COMPRESS_MIN_BYTES", 0)
+    client = TestClient(app)
+    plain = _post(client, "show preferences for member 400000001", **{"Accept-Encoding": "gzip"})
+    compact = _post(
+        client, "show preferences for member 400000001",
+        Accept=COMPACT_JSON, **{"Accept-Encoding": "identity"},
+    )
+    zipped = _post(
+        client, "show preferences for member 400000001",
+        Accept=COMPACT_JSON, **{"Accept-Encoding": "gzip"},
+    )
+    assert plain.headers["content-type"] == "application/json"
+    assert compact.headers["content-type"] == COMPACT_JSON
+    assert compact.headers["vary"] == "Accept, Accept-Encoding"
+    etags = {r.headers["etag"] for r in (plain, compact, zipped)}
+    assert len(etags) == 3
+    assert "content-encoding" not in plain.headers  # default JSON is never compressed
+    assert "content-encoding" not in compact.headers
+    assert zipped.headers["content-encoding"] == "gzip"
+    assert json.loads(zipped.content) == json.loads(compact.content)  # client already decoded it
+    assert json.loads(compact.content)["parts"][1]["json"] == compact_payload(
+        json.loads(plain.content)["parts"][1]["json"]
+    )
+    again = _post(
+        client, "show preferences for member 400000001",
+        Accept=COMPACT_JSON, **{"Accept-Encoding": "identity", "If-None-Match": compact.headers["etag"]},
+    )
+    assert again.status_code == 304